@@ -0,0 +1,90 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_index import find_container_dirs
+    from gtm_script_analyzer import DEFAULT_SIMILARITY, analyze_container, analyze_fleet, find_similar_scripts, rank_findings, replay_frequencies
+    from gtm_trigger_engine import read_records
+    from helpers.gtm_utils import load_script
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+def print_report(report, limit: int):
+    totals = report["totals"]
+    saved = totals["raw_bytes"] - totals["minified_bytes"]
+    print(f"Analyzed {totals['scripts']} script(s) in {totals.get('containers', 1)} container(s): "
+          f"{totals['raw_bytes']:,} bytes, ~{totals['minified_bytes']:,} minified ({saved:,} bytes of comments/whitespace)")
+
+    findings = report["findings"]
+    print(f"\nFindings ranked by estimated firing frequency ({len(findings)}):")
+    for finding in findings[:limit]:
+        location = f"{finding['names'][0]}:{finding['line']}"
+        if totals.get("containers", 1) > 1:
+            location = f"{finding['container']} {location}"
+        print(f"  [{finding['score']:>7}] {finding['check']:<18} {location}")
+        print(f"            {finding['message']} (x{finding['frequency']}/page)")
+    if len(findings) > limit:
+        print(f"  ... {len(findings) - limit} more (use --limit or --json)")
+
+    duplicates = report["duplicates"]
+    if duplicates:
+        print(f"\nIdentical / near-identical scripts ({len(duplicates)} group(s)):")
+        for group in duplicates[:limit]:
+            print(f"  - {group['message']} (similarity {group['similarity']}, ~{group['minified_bytes']:,} bytes each)")
+            members = list(zip(group["containers"], group["names"]))
+            for container, name in members[:10]:
+                print(f"      {container}: {name}" if totals.get("containers", 1) > 1 else f"      {name}")
+            if len(members) > 10:
+                print(f"      ... {len(members) - 10} more")
+
+def main():
+    parser = argparse.ArgumentParser(description="Static analysis of Custom HTML tags and Custom JavaScript variables for client-side performance anti-patterns.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--directory", help="Exported container directory")
+    target.add_argument("--root", help="Scan every exported container under this directory (fleet scan)")
+    parser.add_argument("--events", help="Recorded corpus (see replay.py) used to rank findings by observed firing counts (--directory only)")
+    parser.add_argument("--workers", type=int, help="Worker processes for --root (defaults to the CPU count)")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY, help=f"Minimum similarity for near-identical scripts (default {DEFAULT_SIMILARITY})")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum findings to print")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.root:
+        if not os.path.isdir(args.root):
+            print(f"Error: Directory not found: {args.root}")
+            sys.exit(1)
+        if args.events:
+            print("Error: --events can only be used with --directory")
+            sys.exit(1)
+        report = analyze_fleet(find_container_dirs(args.root), args.workers, args.similarity)
+    else:
+        if not os.path.isdir(args.directory):
+            print(f"Error: Directory not found: {args.directory}")
+            sys.exit(1)
+        tag_frequency = trigger_frequency = None
+        if args.events:
+            with load_script("replay").open_corpus(args.events) as corpus:
+                tag_frequency, trigger_frequency = replay_frequencies(args.directory, read_records(corpus))
+        result = analyze_container(args.directory, tag_frequency, trigger_frequency)
+        report = {
+            "totals": result["totals"],
+            "findings": rank_findings(result["findings"]),
+            "duplicates": find_similar_scripts(result["scripts"], args.similarity),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report, args.limit)
+        print(f"\nDone in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_client import GTMClient
+    from gtm_daemon import GTMDaemon, RPCError, call, default_socket_path, is_running
+    from helpers.env_loader import load_env_file
+    from helpers.entity_store import STORE_BACKENDS
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+OPERATIONS = ["export", "import", "plan", "audit"]
+
+def start(args):
+    """
+    Starts the daemon, detached in the background unless --foreground is given.
+    """
+    if is_running(args.socket):
+        print(f"Daemon already running on {args.socket}")
+        return
+
+    if args.foreground:
+        load_env_file()
+        GTMDaemon(GTMClient(), args.socket).serve_forever()
+        return
+
+    log_path = args.log or f"{args.socket}.log"
+    with open(log_path, "a") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--socket", args.socket, "start", "--foreground"],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True
+        )
+
+    # Wait for the socket to come up (the first OAuth refresh happens here)
+    for _ in range(100):
+        if is_running(args.socket):
+            print(f"Daemon started on {args.socket} (log: {log_path})")
+            return
+        time.sleep(0.1)
+    print(f"Error: Daemon did not start. See {log_path}")
+    sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run GTM Copilot as a warm background daemon and send it operations.")
+    parser.add_argument("--socket", default=default_socket_path(), help="Unix socket path (defaults to GTM_DAEMON_SOCKET or a per-user temp path)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    start_parser = subparsers.add_parser("start", help="Start the daemon")
+    start_parser.add_argument("--foreground", action="store_true", help="Run in the current process instead of detaching")
+    start_parser.add_argument("--log", help="Log file for the detached daemon (defaults to <socket>.log)")
+
+    subparsers.add_parser("stop", help="Stop the daemon")
+    subparsers.add_parser("status", help="Show daemon status and warm workspaces")
+    invalidate_parser = subparsers.add_parser("invalidate", help="Drop the cached state of a workspace (all workspaces without arguments)")
+    invalidate_parser.add_argument("--url", help="GTM Workspace URL")
+    invalidate_parser.add_argument("--account", help="GTM Account ID")
+    invalidate_parser.add_argument("--container", help="GTM Container ID")
+    invalidate_parser.add_argument("--workspace", help="GTM Workspace ID")
+
+    for operation in OPERATIONS:
+        op_parser = subparsers.add_parser(operation, help=f"Run {operation} through the daemon")
+        op_parser.add_argument("--url", help="GTM Workspace URL")
+        op_parser.add_argument("--account", help="GTM Account ID")
+        op_parser.add_argument("--container", help="GTM Container ID")
+        op_parser.add_argument("--workspace", help="GTM Workspace ID")
+        op_parser.add_argument("--directory", help="Directory containing JSON files (defaults to tmp/GTM-ID)")
+        if operation != "audit":
+            op_parser.add_argument("--store", choices=STORE_BACKENDS, help="Local storage backend (defaults to GTM_STORE_BACKEND or json)")
+        if operation == "export":
+            op_parser.add_argument("--delta", action="store_true", help="Only fetch entities changed in the workspace")
+            op_parser.add_argument("--base-version", help="Container version the workspace was created from, required by --delta (latest, live or an ID)")
+
+    args = parser.parse_args()
+
+    if args.command == "start":
+        start(args)
+        return
+
+    if not is_running(args.socket):
+        if args.command == "stop":
+            print("Daemon is not running.")
+            return
+        print(f"Error: No daemon is listening on {args.socket}. Start it with: python scripts/bin/daemon.py start")
+        sys.exit(1)
+
+    method = "shutdown" if args.command == "stop" else args.command
+    params = {}
+    if args.command in OPERATIONS or args.command == "invalidate":
+        keys = ["url", "account", "container", "workspace", "directory", "store", "delta", "base_version"]
+        params = {k: getattr(args, k) for k in keys if getattr(args, k, None)}
+
+    try:
+        result = call(method, params, socket_path=args.socket)
+    except RPCError as e:
+        print(f"Error: {e.message}")
+        sys.exit(1)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
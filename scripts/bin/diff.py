@@ -0,0 +1,85 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_client import GTMClient
+    from gtm_diff import COMPONENT_FILES, count_changes, diff_containers, load_side, write_patch
+    from helpers.env_loader import load_env_file
+    from helpers.gtm_utils import parse_gtm_workspace_url
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+def format_value(value) -> str:
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= 80 else text[:77] + "..."
+
+def print_diff(diff):
+    for ctype in COMPONENT_FILES:
+        changes = diff[ctype]
+        if not any(changes.values()):
+            continue
+        print(ctype)
+        for name in changes["added"]:
+            print(f"  + {name}")
+        for name in changes["removed"]:
+            print(f"  - {name}")
+        for old_name, new_name in changes["renamed"].items():
+            print(f"  > {old_name} -> {new_name}")
+        for name, fields in changes["modified"].items():
+            print(f"  ~ {name}")
+            for change in fields:
+                print(f"      {change['field']}: {format_value(change['old'])} -> {format_value(change['new'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Structural diff between two GTM exports or workspaces (directories or workspace URLs).")
+    parser.add_argument("old", help="Base side: exported directory or GTM workspace URL (e.g. production)")
+    parser.add_argument("new", help="Changed side: exported directory or GTM workspace URL (e.g. staging)")
+    parser.add_argument("--patch", help="Write the added/modified entities of NEW to this directory for import.py")
+    parser.add_argument("--json", action="store_true", help="Print the change set as JSON")
+    id_group = parser.add_mutually_exclusive_group()
+    id_group.add_argument("--match-ids", dest="match_ids", action="store_true", default=None, help="Detect renames by entity ID (default: only if both sides are the same container)")
+    id_group.add_argument("--no-match-ids", dest="match_ids", action="store_false", help="Align entities by name only")
+    args = parser.parse_args()
+
+    client = None
+    if parse_gtm_workspace_url(args.old) or parse_gtm_workspace_url(args.new):
+        load_env_file()
+        client = GTMClient()
+
+    try:
+        old = load_side(args.old, client)
+        new = load_side(args.new, client)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    diff = diff_containers(old, new, args.match_ids)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(diff, indent=2, ensure_ascii=False))
+    else:
+        print_diff(diff)
+        entities = sum(len(old.get(c, [])) + len(new.get(c, [])) for c in COMPONENT_FILES)
+        print(f"\n{count_changes(diff)} change(s) across {entities} entities in {elapsed * 1000:.1f} ms")
+
+    if args.patch:
+        counts = write_patch(diff, new, args.patch)
+        summary = ", ".join(f"{count} {ctype}" for ctype, count in counts.items())
+        print(f"Patch written to {args.patch} ({summary}). Apply with: python scripts/bin/import.py --url <TARGET_URL> --directory {args.patch}", file=sys.stderr if args.json else sys.stdout)
+        removed = [f"{ctype}:{name}" for ctype in COMPONENT_FILES for name in diff[ctype]["removed"]]
+        renamed = [f"{ctype}:{old_name}" for ctype in COMPONENT_FILES for old_name in diff[ctype]["renamed"]]
+        if removed or renamed:
+            print("Note: import.py does not delete entities. Remove these in the target manually: "
+                  + ", ".join(removed + renamed), file=sys.stderr if args.json else sys.stdout)
+
+if __name__ == "__main__":
+    main()
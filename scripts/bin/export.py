@@ -2,6 +2,8 @@ import sys
 import os
 import json
 import argparse
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
 
 # Add parent directory to path to import local modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -10,6 +12,9 @@ try:
     from gtm_client import GTMClient
     from helpers.env_loader import load_env_file
     from helpers.gtm_utils import parse_gtm_workspace_url, resolve_gtm_path
+    from helpers.entity_store import EntityStore, STORE_BACKENDS, open_store
+    # Imported by its bare name: the module instance the HTTP hooks report to
+    import tracing
 except ImportError as e:
     print(f"Error: Could not import necessary modules: {e}")
     sys.exit(1)
@@ -25,6 +30,177 @@ def save_to_json(data, directory, filename):
         json.dump(data, f, indent=2, ensure_ascii=False)
     print(f"Exported: {path}")
 
+def save_component(data, output_dir: str, ctype: str, store: Optional[EntityStore] = None):
+    """
+    Saves one component type either as the classic JSON file or into an entity store.
+    """
+    if store is None:
+        save_to_json(data, output_dir, f"{ctype}.json")
+        return
+    written = store.replace_all(ctype, data)
+    print(f"Exported: {store.describe(ctype)} ({written} of {len(data)} entities written)")
+
+def export_workspace(client: GTMClient, workspace_path: str, output_dir: str, store: Optional[EntityStore] = None) -> Dict[str, int]:
+    """
+    Fetches tags, triggers, variables and built-in variables of a workspace
+    and writes them to output_dir (or the given entity store, committed atomically).
+    Returns the number of items per component type.
+    """
+    print(f"Starting export for workspace: {workspace_path}")
+    print(f"Output directory: {output_dir}")
+    
+    # Fetch Tags
+    print("Fetching tags...")
+    with tracing.span("fetch tags"):
+        tags = client.list_tags(workspace_path)
+    
+    # Fetch Triggers
+    print("Fetching triggers...")
+    with tracing.span("fetch triggers"):
+        triggers = client.list_triggers(workspace_path)
+    
+    # Fetch Variables
+    print("Fetching variables...")
+    with tracing.span("fetch variables"):
+        variables = client.list_variables(workspace_path)
+
+    # Fetch Built-in Variables
+    print("Fetching built-in variables...")
+    with tracing.span("fetch built-in variables"):
+        built_in_vars = client.list_built_in_variables(workspace_path)
+
+    components = {
+        "tags": tags,
+        "triggers": triggers,
+        "variables": variables,
+        "built_in_variables": built_in_vars,
+    }
+    with tracing.span("write"), (store.batch() if store else nullcontext()):
+        for ctype, data in components.items():
+            save_component(data, output_dir, ctype, store)
+
+    return {ctype: len(data) for ctype, data in components.items()}
+
+# Entity kinds handled by delta export: export file, key in status/version payloads, ID field
+DELTA_COMPONENTS = [
+    ("tags", "tag", "tagId"),
+    ("triggers", "trigger", "triggerId"),
+    ("variables", "variable", "variableId"),
+]
+
+def rebase_entity(item: Dict[str, Any], workspace_path: str, ctype: str, id_field: str) -> Dict[str, Any]:
+    """
+    Rewrites the location fields of a container-version entity so that it looks
+    like the same entity listed from the workspace.
+    """
+    entity_id = item.get(id_field)
+    path = f"{workspace_path}/{ctype}/{entity_id}"
+    rebased = {
+        "path": path,
+        "accountId": item.get("accountId"),
+        "containerId": item.get("containerId"),
+        "workspaceId": workspace_path.rsplit("/", 1)[-1],
+        id_field: entity_id,
+    }
+    for key, value in item.items():
+        if key not in rebased:
+            rebased[key] = value
+    rebased["tagManagerUrl"] = f"https://tagmanager.google.com/#/container/{path}?apiLink={ctype[:-1]}"
+    return rebased
+
+def load_base_version(client: GTMClient, container_path: str, workspace_path: str, output_dir: str, base_version: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Returns the entities of the base container version, rebased onto the workspace.
+    Container versions are immutable, so each version is fetched once and cached
+    under <output_dir>/.base/version-<id>/.
+    base_version: "latest", "live" or a numeric container version ID.
+    """
+    version = None
+    if base_version == "latest":
+        version_id = client.get_latest_version_header(container_path).get("containerVersionId")
+    elif base_version == "live":
+        version = client.get_live_version(container_path)
+        version_id = version.get("containerVersionId")
+    else:
+        version_id = str(base_version)
+
+    cache_dir = os.path.join(output_dir, ".base", f"version-{version_id}")
+    if all(os.path.exists(os.path.join(cache_dir, f"{ctype}.json")) for ctype, _, _ in DELTA_COMPONENTS):
+        print(f"Using cached base version {version_id}: {cache_dir}")
+        base = {}
+        for ctype, _, _ in DELTA_COMPONENTS:
+            with open(os.path.join(cache_dir, f"{ctype}.json"), 'r', encoding='utf-8') as f:
+                base[ctype] = json.load(f)
+        return base
+
+    if version is None:
+        print(f"Fetching base container version {version_id}...")
+        version = client.get_container_version(f"{container_path}/versions/{version_id}")
+
+    base = {}
+    for ctype, key, id_field in DELTA_COMPONENTS:
+        base[ctype] = [rebase_entity(item, workspace_path, ctype, id_field) for item in version.get(key, [])]
+        save_to_json(base[ctype], cache_dir, f"{ctype}.json")
+    return base
+
+def export_workspace_delta(client: GTMClient, workspace_path: str, output_dir: str, base_version: str, store: Optional[EntityStore] = None) -> Dict[str, int]:
+    """
+    Exports a workspace starting from the cached base container version and
+    applying only the entities the workspace status reports as added, updated
+    or deleted. Returns the number of changed entities per component type.
+    base_version must be the version the workspace was created from (or last
+    synced to): the status only lists changes relative to that version, and
+    the API cannot tell which version it is. Raises ValueError if the
+    workspace reports merge conflicts, i.e. it is behind the latest version.
+    """
+    container_path = workspace_path.rsplit("/workspaces/", 1)[0]
+    print(f"Starting delta export for workspace: {workspace_path}")
+    print(f"Output directory: {output_dir}")
+
+    with tracing.span("load base version", base_version=base_version):
+        base = load_base_version(client, container_path, workspace_path, output_dir, base_version)
+
+    print("Fetching workspace status...")
+    with tracing.span("fetch workspace status"):
+        status = client.get_workspace_status(workspace_path)
+    if status.get("mergeConflict"):
+        raise ValueError(f"Workspace has {len(status['mergeConflict'])} merge conflict(s), so it is not based on "
+                         f"version {base_version}. Run a full export instead.")
+
+    changes = {ctype: 0 for ctype, _, _ in DELTA_COMPONENTS}
+    merged_components = {}
+    for ctype, key, id_field in DELTA_COMPONENTS:
+        with tracing.span(f"apply {ctype} changes"):
+            # Keep the base order; updated entities stay in place, added ones are appended
+            merged = {str(item.get(id_field)): item for item in base[ctype]}
+            for change in status.get("workspaceChange", []):
+                entity = change.get(key)
+                change_status = change.get("changeStatus")
+                if not entity or change_status not in ("added", "updated", "deleted"):
+                    continue
+                entity_id = str(entity.get(id_field))
+                changes[ctype] += 1
+                if change_status == "deleted":
+                    merged.pop(entity_id, None)
+                    continue
+                if "type" not in entity:
+                    # Status entries normally embed the full entity; fetch it if not
+                    entity = getattr(client, f"get_{key}")(entity["path"])
+                merged[entity_id] = entity
+            merged_components[ctype] = list(merged.values())
+
+    # Built-in variables are not part of the status; listing them is a single call
+    print("Fetching built-in variables...")
+    with tracing.span("fetch built-in variables"):
+        merged_components["built_in_variables"] = client.list_built_in_variables(workspace_path)
+
+    with tracing.span("write"), (store.batch() if store else nullcontext()):
+        for ctype, data in merged_components.items():
+            save_component(data, output_dir, ctype, store)
+
+    print(f"Applied workspace changes: {changes}")
+    return changes
+
 def main():
     parser = argparse.ArgumentParser(description="Export GTM tags, triggers, and variables to JSON files.")
     parser.add_argument("--url", help="GTM Workspace URL")
@@ -32,8 +208,18 @@ def main():
     parser.add_argument("--container", help="GTM Container ID")
     parser.add_argument("--workspace", help="GTM Workspace ID")
     parser.add_argument("--output", help="Output directory (defaults to tmp/GTM-ID)")
+    parser.add_argument("--delta", action="store_true", help="Only fetch entities changed in the workspace, starting from a cached export of the base version")
+    parser.add_argument("--base-version", help="Container version the workspace was created from, required by --delta: 'latest', 'live' or a version ID")
+    parser.add_argument("--store", choices=STORE_BACKENDS, help="Local storage backend (defaults to GTM_STORE_BACKEND or json)")
+    parser.add_argument("--trace", help="Record API requests and export phases to this file (Chrome trace, or JSON Lines if it ends in .jsonl) and print the slowest endpoints")
     
     args = parser.parse_args()
+    if args.delta and not args.base_version:
+        print("Error: --delta requires --base-version (the version the workspace was created from). "
+              "A delta on the wrong base is silently incomplete; use a full export if unsure.")
+        sys.exit(1)
+    if args.trace:
+        tracing.enable()
     
     # Load credentials from .env
     load_env_file()
@@ -64,39 +250,26 @@ def main():
     
     try:
         # Fetch container info to get Public ID for folder name
-        container_info = client.get_container(container_path)
+        with tracing.span("fetch container"):
+            container_info = client.get_container(container_path)
         public_id = container_info.get("publicId", f"GTM-{container_id}")
         
         output_dir = resolve_gtm_path(output_dir, public_id)
 
-        print(f"Starting export for workspace: {workspace_path}")
-        print(f"Output directory: {output_dir}")
-        
-        # Fetch Tags
-        print("Fetching tags...")
-        tags = client.list_tags(workspace_path)
-        save_to_json(tags, output_dir, "tags.json")
-        
-        # Fetch Triggers
-        print("Fetching triggers...")
-        triggers = client.list_triggers(workspace_path)
-        save_to_json(triggers, output_dir, "triggers.json")
-        
-        # Fetch Variables
-        print("Fetching variables...")
-        variables = client.list_variables(workspace_path)
-        save_to_json(variables, output_dir, "variables.json")
-
-        # Fetch Built-in Variables
-        print("Fetching built-in variables...")
-        built_in_vars = client.list_built_in_variables(workspace_path)
-        save_to_json(built_in_vars, output_dir, "built_in_variables.json")
+        store = open_store(output_dir, args.store)
+        if args.delta:
+            export_workspace_delta(client, workspace_path, output_dir, args.base_version, store=store)
+        else:
+            export_workspace(client, workspace_path, output_dir, store=store)
         
         print("\nExport completed successfully.")
         
     except Exception as e:
         print(f"\nAn error occurred during export: {e}")
         sys.exit(1)
+    finally:
+        if args.trace:
+            tracing.finish(args.trace)
 
 if __name__ == "__main__":
     main()
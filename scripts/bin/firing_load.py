@@ -0,0 +1,70 @@
+import sys
+import os
+import json
+import argparse
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_firing_load import DEFAULT_BUDGET, GROUPINGS, FiringLoad, check_budgets, sort_groups
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+def format_range(low: int, high: int) -> str:
+    return str(high) if low == high else f"{low}-{high}"
+
+def print_report(groups, order, findings, verbose: bool, label: str):
+    over = {f["names"][0] for f in findings}
+    print(f"{label.upper():<40} {'TAGS':>8} {'HTML BYTES':>14}")
+    for key in order:
+        group = groups[key]
+        flag = "  OVER BUDGET" if key in over else ""
+        print(f"{key:<40} {format_range(group['min_tags'], group['max_tags']):>8} "
+              f"{format_range(group['min_bytes'], group['max_bytes']):>14}{flag}")
+        if verbose:
+            for tag in group["tags"]:
+                marker = "?" if tag["conditional"] else " "
+                print(f"    {marker} {tag['name']} ({tag['type']}, {tag['bytes']} B) <- {tag['via']}")
+    print("\nRanges are lower-upper bounds: the lower bound only counts tags whose trigger has no conditions.")
+    if findings:
+        print("\nBudget exceeded:")
+        for finding in findings:
+            print(f"  - {finding['message']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate how many tags and Custom HTML bytes fire on each event of an exported container.")
+    parser.add_argument("--directory", required=True, help="Exported container directory (tags.json, triggers.json)")
+    parser.add_argument("--group-by", choices=GROUPINGS, default="event", help="Group by event name (default) or trigger type")
+    parser.add_argument("--max-tags", type=int, default=DEFAULT_BUDGET["tags"], help=f"Default budget of tags per event (default {DEFAULT_BUDGET['tags']})")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_BUDGET["bytes"], help=f"Default budget of Custom HTML bytes per event (default {DEFAULT_BUDGET['bytes']})")
+    parser.add_argument("--budgets", help='JSON file with per-event budgets, e.g. {"gtm.js": {"tags": 5}, "page load": {"bytes": 50000}}')
+    parser.add_argument("--verbose", action="store_true", help="List the tags counted in each group")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--strict", action="store_true", help="Exit with status 2 if any budget is exceeded")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: Directory not found: {args.directory}")
+        sys.exit(1)
+
+    budgets = {}
+    if args.budgets:
+        with open(args.budgets, 'r', encoding='utf-8') as f:
+            budgets = json.load(f)
+
+    groups = FiringLoad.from_directory(args.directory).analyze(args.group_by)
+    findings = check_budgets(groups, budgets, {"tags": args.max_tags, "bytes": args.max_bytes})
+    order = sort_groups(groups)
+
+    if args.json:
+        print(json.dumps({"groups": {k: groups[k] for k in order}, "findings": findings}, indent=2, ensure_ascii=False))
+    else:
+        print_report(groups, order, findings, args.verbose, args.group_by)
+
+    if args.strict and findings:
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_fleet_audit import DEFAULT_CACHE_PATH, DEFAULT_MIN_CONTAINERS, FleetAuditCache, audit_fleet
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+def print_report(report, root: str, limit: int, details: bool, elapsed: float):
+    totals = report["totals"]
+    aggregates = report["aggregates"]
+
+    def label(directory: str) -> str:
+        return os.path.relpath(directory, root)
+
+    print(f"Audited {totals['containers']} container(s) ({totals['audited']} changed, {totals['cached']} from cache) "
+          f"in {elapsed:.1f}s: {totals['findings']} finding(s)")
+
+    if aggregates["findings_by_check"]:
+        print("\nFindings by check:")
+        for check, entry in aggregates["findings_by_check"].items():
+            print(f"  {check:<12} {entry['findings']:>6} in {entry['containers']} container(s)")
+
+    ranked = sorted(report["containers"], key=lambda r: -len(r["findings"]))
+    ranked = [r for r in ranked if r["findings"]][:limit]
+    if ranked:
+        print("\nContainers with the most findings:")
+        for result in ranked:
+            print(f"  {len(result['findings']):>6}  {label(result['directory'])}")
+
+    if aggregates["measurement_ids"]:
+        print("\nMeasurement IDs hard-coded across containers:")
+        for entry in aggregates["measurement_ids"][:limit]:
+            print(f"  {entry['value']:<16} in {entry['containers']} containers ({entry['tags']} tags)")
+
+    if aggregates["copied_scripts"]:
+        print("\nIdentical scripts copied across containers:")
+        for entry in aggregates["copied_scripts"][:limit]:
+            names = ", ".join(f"'{name}'" for name in entry["names"][:3])
+            print(f"  {entry['bytes'] / 1024:>7.1f} KB in {entry['containers']} containers ({entry['type']}: {names}; {entry['hash'][:10]})")
+
+    if details:
+        for result in report["containers"]:
+            if not result["findings"]:
+                continue
+            print(f"\n{label(result['directory'])}")
+            for finding in result["findings"]:
+                names = ", ".join(str(name) for name in finding["names"])
+                print(f"  [{finding['check']}] {finding['type']}: {names + ' - ' if names else ''}{finding['message']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit every exported GTM container under a directory in parallel and aggregate the findings across containers.")
+    parser.add_argument("root", nargs="?", default="tmp", help="Directory containing exported containers (defaults to tmp)")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to the CPU count; 1 disables the pool)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help=f"Result cache keyed by export fingerprint (default {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--no-cache", action="store_true", help="Re-audit every container and leave the cache untouched")
+    parser.add_argument("--min-containers", type=int, default=DEFAULT_MIN_CONTAINERS, help=f"Containers an ID or script must appear in to be reported as shared (default {DEFAULT_MIN_CONTAINERS})")
+    parser.add_argument("--limit", type=int, default=10, help="Entries shown per section (default 10)")
+    parser.add_argument("--details", action="store_true", help="Also list the findings of every container")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"Error: Directory not found: {args.root}")
+        sys.exit(1)
+
+    cache = None if args.no_cache else FleetAuditCache(args.cache)
+    start = time.perf_counter()
+    try:
+        report = audit_fleet(args.root, args.workers, cache, args.min_containers)
+    finally:
+        if cache:
+            cache.close()
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report, os.path.abspath(args.root), args.limit, args.details, elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import sys
 import os
-import json
 import argparse
+from contextlib import nullcontext
 from typing import Dict, List, Any, Optional
 
 # Add parent directory to path to import local modules
@@ -10,76 +10,50 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 try:
     from gtm_client import GTMClient
     from helpers.env_loader import load_env_file
-    from helpers.gtm_utils import parse_gtm_workspace_url, resolve_gtm_path
+    from helpers.gtm_utils import parse_gtm_workspace_url, resolve_gtm_path, clean_item
+    from helpers.entity_store import EntityStore, ID_FIELDS, STORE_BACKENDS, SQLITE_STORE_FILENAME, open_store
+    from helpers.file_watcher import DebouncedWatcher
+    # Imported by its bare name: the module instance the HTTP hooks report to
+    import tracing
 except ImportError as e:
     print(f"Error: Could not import necessary modules: {e}")
     sys.exit(1)
 
-def load_json(directory: str, filename: str) -> List[Dict[str, Any]]:
-    """
-    Loads data from a JSON file if it exists.
-    """
-    path = os.path.join(directory, filename)
-    if not os.path.exists(path):
-        print(f"Warning: {path} not found. Skipping...")
-        return []
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def save_json(directory: str, filename: str, data: List[Dict[str, Any]]):
-    """
-    Saves data to a JSON file.
-    """
-    path = os.path.join(directory, filename)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-def clean_item(item: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Removes GTM-generated read-only fields from a tag, trigger, or variable.
-    """
-    cleaned = item.copy()
-    # Common fields to remove
-    fields_to_remove = [
-        "path", "accountId", "containerId", "workspaceId", 
-        "fingerprint", "tagId", "triggerId", "variableId", "parentFolderId", "tagManagerUrl",
-        "monitoringMetadata"
-    ]
-    for field in fields_to_remove:
-        cleaned.pop(field, None)
-    
-    return cleaned
-
 class GTMDependencyResolver:
     """
     Resolves dependency between GTM components by name.
     If a component is referenced by name and doesn't exist, it creates it.
     """
-    def __init__(self, client: GTMClient, workspace_path: str, directory: str):
+    def __init__(self, client: GTMClient, workspace_path: str, directory: str, dry_run: bool = False, store: Optional[EntityStore] = None,
+                 remote_registry: Optional[Dict[str, Dict[str, Any]]] = None):
         self.client = client
         self.workspace_path = workspace_path
         self.directory = directory
+        # In dry-run mode missing dependencies are recorded instead of created
+        self.dry_run = dry_run
+        self.planned_creates: List[str] = []
+        # Local entities live in JSON files by default, or in SQLite (see
+        # helpers/entity_store.py). They are read one at a time by name or ID,
+        # so a large container is never held in memory as a whole.
+        self.store = store or open_store(directory)
+        # Local IDs overwritten by write-back (type -> old ID -> name), so that
+        # references still holding them resolve after their target was synced
+        self.replaced_ids: Dict[str, Dict[str, str]] = {ctype: {} for ctype in ID_FIELDS}
         
-        # Original order from JSON files to preserve it during save
-        self.variables_list = load_json(directory, "variables.json")
-        self.triggers_list = load_json(directory, "triggers.json")
-        self.tags_list = load_json(directory, "tags.json")
-
-        # Registry of local components from JSON (keyed by type then name)
-        self.local_repo = {
-            "variables": {v['name']: v for v in self.variables_list},
-            "triggers": {t['name']: t for t in self.triggers_list},
-            "tags": {t['name']: t for t in self.tags_list},
-        }
-        
-        # Registry of remote components in the workspace (keyed by type then name)
+        # Registry of remote components in the workspace (keyed by type then name).
+        # Callers keeping it between imports (the daemon) pass it in; it is
+        # updated in place with every entity this resolver creates or updates.
+        self.remote_registry = remote_registry if remote_registry is not None else self.fetch_remote_registry()
+
+    def fetch_remote_registry(self) -> Dict[str, Dict[str, Any]]:
         print("Fetching existing items in workspace...")
-        self.remote_registry = {
-            "variables": {v['name']: v for v in client.list_variables(workspace_path)},
-            "triggers": {t['name']: t for t in client.list_triggers(workspace_path)},
-            "tags": {t['name']: t for t in client.list_tags(workspace_path)},
-            "built_in_variables": {v['type']: v for v in client.list_built_in_variables(workspace_path)}
-        }
+        with tracing.span("fetch workspace"):
+            return {
+                "variables": {v['name']: v for v in self.client.list_variables(self.workspace_path)},
+                "triggers": {t['name']: t for t in self.client.list_triggers(self.workspace_path)},
+                "tags": {t['name']: t for t in self.client.list_tags(self.workspace_path)},
+                "built_in_variables": {v['type']: v for v in self.client.list_built_in_variables(self.workspace_path)}
+            }
 
     def resolve_id(self, component_type: str, name_or_id: Any) -> str:
         """
@@ -89,9 +63,16 @@ class GTMDependencyResolver:
             return name_or_id
             
         val_str = str(name_or_id)
-        # If it's already a name in our local repo or remote registry, ensure it exists and get ID.
-        if val_str in self.remote_registry.get(component_type, {}) or val_str in self.local_repo.get(component_type, {}):
+        # If it's already a name in our local store or remote registry, ensure it exists and get ID.
+        if val_str in self.remote_registry.get(component_type, {}) or self.store.get(component_type, val_str) is not None:
             return self.ensure_component(component_type, val_str)
+
+        # An ID from the export: resolve it through the local entity's name
+        if val_str in self.replaced_ids.get(component_type, {}):
+            return self.ensure_component(component_type, self.replaced_ids[component_type][val_str])
+        local_item = self.store.get_by_id(component_type, val_str)
+        if local_item is not None:
+            return self.ensure_component(component_type, local_item["name"])
             
         return val_str
 
@@ -105,13 +86,19 @@ class GTMDependencyResolver:
             id_map = {"tags": "tagId", "triggers": "triggerId", "variables": "variableId"}
             return item.get(id_map.get(component_type))
 
-        # 2. Not found remotely, check local repo
-        if name not in self.local_repo.get(component_type, {}):
+        # 2. Not found remotely, check the local store
+        item = self.store.get(component_type, name)
+        if item is None:
             print(f"Warning: Dependency {component_type} '{name}' not found locally or remotely.")
             return name 
 
         # 3. Exists locally, need to create
-        item = self.local_repo[component_type][name]
+        if self.dry_run:
+            key = f"{component_type}:{name}"
+            if key not in self.planned_creates:
+                self.planned_creates.append(key)
+            return name
+
         print(f" -> Auto-creating dependency: {component_type[:-1]} '{name}'")
         
         processed_item = self._process_dependencies(component_type, item)
@@ -121,9 +108,9 @@ class GTMDependencyResolver:
             method_name = f"create_{component_type[:-1]}"
             new_item = getattr(self.client, method_name)(self.workspace_path, cleaned_item)
             
-            # Update registries and local repo with the full remote object
+            # Update the registry and the local store with the full remote object
             self.remote_registry[component_type][name] = new_item
-            self.local_repo[component_type][name].update(new_item)
+            self.write_back(component_type, item, new_item)
             
             id_map = {"tags": "tagId", "triggers": "triggerId", "variables": "variableId"}
             return new_item.get(id_map.get(component_type))
@@ -131,6 +118,17 @@ class GTMDependencyResolver:
             print(f"Error during auto-creation of {name}: {e}")
             raise e
 
+    def write_back(self, component_type: str, item: Dict[str, Any], remote_item: Dict[str, Any]):
+        """
+        Copies the remote metadata (IDs, fingerprint) into a local entity and stores it.
+        """
+        id_field = ID_FIELDS[component_type]
+        old_id = item.get(id_field)
+        if old_id is not None and str(old_id) != str(remote_item.get(id_field)):
+            self.replaced_ids[component_type][str(old_id)] = item["name"]
+        item.update(remote_item)
+        self.store.put(component_type, item)
+
     def _process_dependencies(self, component_type: str, item: Dict[str, Any]) -> Dict[str, Any]:
         """
         Finds and resolves all name-based references within a component body.
@@ -155,6 +153,194 @@ class GTMDependencyResolver:
 
         return processed
 
+def import_workspace(client: GTMClient, workspace_path: str, directory: str, dry_run: bool = False, store: Optional[EntityStore] = None) -> Dict[str, List[str]]:
+    """
+    Synchronizes the local entities in directory with the workspace.
+    With dry_run=True nothing is written remotely or locally; the returned
+    summary then describes what an import would do (the "plan").
+    Summary keys: created, updated, skipped, errors (as "type:name" entries).
+    """
+    resolver = GTMDependencyResolver(client, workspace_path, directory, dry_run=dry_run, store=store)
+    return sync_workspace(resolver)
+
+def new_summary() -> Dict[str, List[str]]:
+    """
+    Returns an empty import summary (lists of "type:name" entries).
+    """
+    return {"created": [], "updated": [], "skipped": [], "errors": []}
+
+def sync_built_in_variables(resolver: GTMDependencyResolver, summary: Dict[str, List[str]]):
+    """
+    Enables the locally listed built-in variables that are not enabled remotely.
+    """
+    client = resolver.client
+    workspace_path = resolver.workspace_path
+    dry_run = resolver.dry_run
+    built_in_vars = resolver.store.load("built_in_variables")
+    if built_in_vars:
+        existing_built_ins = resolver.remote_registry["built_in_variables"]
+        types_to_enable = [v['type'] for v in built_in_vars if v.get('type') not in existing_built_ins]
+        if types_to_enable and dry_run:
+            summary["created"].extend(f"built_in_variables:{t}" for t in types_to_enable)
+        elif types_to_enable:
+            print("Enabling built-in variables...")
+            try:
+                for new_variable in client.create_built_in_variables(workspace_path, types_to_enable):
+                    existing_built_ins[new_variable.get('type')] = new_variable
+                summary["created"].extend(f"built_in_variables:{t}" for t in types_to_enable)
+                print(f"Successfully enabled {len(types_to_enable)} built-in variables.")
+            except Exception as e:
+                summary["errors"].append(f"built_in_variables:{e}")
+                print(f"Warning: {e}")
+
+def sync_workspace(resolver: GTMDependencyResolver) -> Dict[str, List[str]]:
+    """
+    Runs a full import with an existing resolver: built-in variables first,
+    then variables, triggers and tags.
+    """
+    summary = new_summary()
+    dry_run = resolver.dry_run
+
+    # 1. Built-in Variables
+    with tracing.span("sync built_in_variables"):
+        sync_built_in_variables(resolver, summary)
+
+    # 2. Main Components (Variables -> Triggers -> Tags)
+    for ctype in ["variables", "triggers", "tags"]:
+        names = resolver.store.names(ctype)
+        if not names:
+            continue
+            
+        print(f"Processing {ctype}...")
+        # Local write-backs of one component type are committed together
+        with tracing.span(f"sync {ctype}", entities=len(names)), (nullcontext() if dry_run else resolver.store.batch()):
+            for name in names:
+                sync_entity(resolver, ctype, name, resolver.store.get(ctype, name), summary)
+
+    if dry_run:
+        summary["created"].extend(resolver.planned_creates)
+    return summary
+
+def sync_entity(resolver: GTMDependencyResolver, ctype: str, name: str, item: Dict[str, Any], summary: Dict[str, List[str]]):
+    """
+    Creates, updates or skips one local entity and writes the returned
+    metadata (IDs, fingerprints) back to the store.
+    """
+    client = resolver.client
+    dry_run = resolver.dry_run
+    key = f"{ctype}:{name}"
+    remote_item = resolver.remote_registry[ctype].get(name)
+    processed = resolver._process_dependencies(ctype, item)
+    
+    if remote_item:
+        # Content-based skip logic
+        if clean_item(processed) == clean_item(remote_item):
+            # Even if fingerprint is missing locally, if content matches, we're good
+            print(f" - Skipping {ctype[:-1]} '{name}' (content matches)")
+            summary["skipped"].append(key)
+            # Still update local metadata (ID, fingerprint) from remote for future sync
+            if not dry_run:
+                resolver.write_back(ctype, item, remote_item)
+            return
+            
+        print(f" - Updating {ctype[:-1]} '{name}'")
+        if dry_run:
+            summary["updated"].append(key)
+            return
+        try:
+            method_name = f"update_{ctype[:-1]}"
+            new_item = getattr(client, method_name)(remote_item['path'], clean_item(processed))
+            resolver.remote_registry[ctype][name] = new_item
+            resolver.write_back(ctype, item, new_item)
+            summary["updated"].append(key)
+        except Exception as e:
+            summary["errors"].append(key)
+            print(f"Error updating {name}: {e}")
+    else:
+        print(f" - Creating {ctype[:-1]} '{name}'")
+        if dry_run:
+            if key not in resolver.planned_creates:
+                resolver.planned_creates.append(key)
+            return
+        try:
+            # ensure_component will create if missing and update item in place
+            resolver.ensure_component(ctype, name)
+            summary["created"].append(key)
+        except Exception as e:
+            summary["errors"].append(key)
+            print(f"Error creating {name}: {e}")
+
+def watch_workspace(
+    client: GTMClient,
+    workspace_path: str,
+    directory: str,
+    store_backend: Optional[str] = None,
+    debounce: float = 0.5,
+    poll_interval: float = 1.0,
+    force_polling: bool = False
+):
+    """
+    Runs a full import, then keeps watching directory and pushes only the
+    entities whose content hash changed through the resolver. The remote
+    registry is fetched once; changes made by others in the GTM UI while
+    watching are not picked up (restart the watch to refresh).
+    """
+    resolver = GTMDependencyResolver(client, workspace_path, directory, store=open_store(directory, store_backend))
+    sync_workspace(resolver)
+
+    def snapshot(store: EntityStore) -> Dict[tuple, str]:
+        # SQLite answers this from an index; the JSON files have to be re-read and hashed
+        return {
+            (ctype, name): digest
+            for ctype in ["variables", "triggers", "tags"]
+            for name, digest in store.hashes(ctype).items()
+        }
+
+    def accept(filename: str) -> bool:
+        return filename.endswith(".json") or filename.startswith(SQLITE_STORE_FILENAME)
+
+    hashes = snapshot(resolver.store)
+    watcher = DebouncedWatcher(directory, accept, debounce, poll_interval, force_polling)
+    # Our own metadata write-back must not wake the watcher up again
+    watcher.ignore_own_writes(name for name in os.listdir(directory) if accept(name))
+    print(f"\nWatching {directory} for changes ({watcher.backend}). Press Ctrl+C to stop.")
+
+    try:
+        while True:
+            changed_files = watcher.next_batch()
+            # A fresh store re-reads the files; the previous one is closed once it is replaced
+            store = open_store(directory, store_backend)
+            try:
+                current = snapshot(store)
+            except ValueError as e:
+                # Typically a half-written JSON file; the next write triggers a retry
+                store.close()
+                print(f"Skipping change in {', '.join(sorted(changed_files))}: {e}")
+                continue
+            resolver.store.close()
+            resolver.store = store
+
+            summary = new_summary()
+            sync_built_in_variables(resolver, summary)
+            for ctype in ["variables", "triggers", "tags"]:
+                names = [name for (t, name), digest in current.items() if t == ctype and hashes.get((t, name)) != digest]
+                if not names:
+                    continue
+                with resolver.store.batch():
+                    for name in names:
+                        sync_entity(resolver, ctype, name, resolver.store.get(ctype, name), summary)
+
+            # Write-back replaces name references with IDs, so hash the synced state
+            hashes = snapshot(resolver.store)
+            watcher.ignore_own_writes(name for name in os.listdir(directory) if accept(name))
+            print(f"Synced: {len(summary['created'])} created, {len(summary['updated'])} updated, "
+                  f"{len(summary['skipped'])} unchanged, {len(summary['errors'])} errors")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
+        resolver.store.close()
+
 def main():
     parser = argparse.ArgumentParser(description="Import GTM items with content-based skipping and local updates.")
     parser.add_argument("--url", help="GTM Workspace URL")
@@ -162,8 +348,16 @@ def main():
     parser.add_argument("--container", help="GTM Container ID")
     parser.add_argument("--workspace", help="GTM Workspace ID")
     parser.add_argument("--directory", help="Directory containing JSON files")
+    parser.add_argument("--store", choices=STORE_BACKENDS, help="Local storage backend (defaults to GTM_STORE_BACKEND or json)")
+    parser.add_argument("--watch", action="store_true", help="After importing, keep watching the directory and sync changed entities")
+    parser.add_argument("--debounce", type=float, default=0.5, help="Seconds of quiet before a burst of edits is synced (with --watch)")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Polling interval in seconds where inotify is unavailable (with --watch)")
+    parser.add_argument("--poll", action="store_true", help="Poll for changes instead of using inotify, e.g. on NFS or Docker bind mounts (with --watch)")
+    parser.add_argument("--trace", help="Record API requests and import phases to this file (Chrome trace, or JSON Lines if it ends in .jsonl) and print the slowest endpoints")
     
     args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
     load_env_file()
     
     client = GTMClient()
@@ -191,7 +385,8 @@ def main():
     
     try:
         # Fetch container info to get Public ID for folder name
-        container_info = client.get_container(container_path)
+        with tracing.span("fetch container"):
+            container_info = client.get_container(container_path)
         public_id = container_info.get("publicId", f"GTM-{container_id}")
         
         directory = resolve_gtm_path(directory, public_id)
@@ -203,59 +398,11 @@ def main():
             print(f"Error: Directory not found: {directory}")
             sys.exit(1)
 
-        resolver = GTMDependencyResolver(client, workspace_path, directory)
+        if args.watch:
+            watch_workspace(client, workspace_path, directory, args.store, args.debounce, args.poll_interval, args.poll)
+            return
 
-        # 1. Built-in Variables
-        built_in_vars = load_json(directory, "built_in_variables.json")
-        if built_in_vars:
-            print("Enabling built-in variables...")
-            existing_built_ins = resolver.remote_registry["built_in_variables"]
-            types_to_enable = [v['type'] for v in built_in_vars if v.get('type') not in existing_built_ins]
-            if types_to_enable:
-                try:
-                    client.create_built_in_variables(workspace_path, types_to_enable)
-                    print(f"Successfully enabled {len(types_to_enable)} built-in variables.")
-                except Exception as e:
-                    print(f"Warning: {e}")
-
-        # 2. Main Components (Variables -> Triggers -> Tags)
-        for ctype in ["variables", "triggers", "tags"]:
-            local_map = resolver.local_repo[ctype]
-            if not local_map:
-                continue
-                
-            print(f"Processing {ctype}...")
-            for name, item in local_map.items():
-                remote_item = resolver.remote_registry[ctype].get(name)
-                processed = resolver._process_dependencies(ctype, item)
-                
-                if remote_item:
-                    # Content-based skip logic
-                    if clean_item(processed) == clean_item(remote_item):
-                        # Even if fingerprint is missing locally, if content matches, we're good
-                        print(f" - Skipping {ctype[:-1]} '{name}' (content matches)")
-                        # Still update local metadata (ID, fingerprint) from remote for future sync
-                        item.update(remote_item)
-                        continue
-                        
-                    print(f" - Updating {ctype[:-1]} '{name}'")
-                    try:
-                        method_name = f"update_{ctype[:-1]}"
-                        new_item = getattr(client, method_name)(remote_item['path'], clean_item(processed))
-                        item.update(new_item)
-                    except Exception as e:
-                        print(f"Error updating {name}: {e}")
-                else:
-                    print(f" - Creating {ctype[:-1]} '{name}'")
-                    try:
-                        # ensure_component will create if missing and update item in place
-                        resolver.ensure_component(ctype, name)
-                    except Exception as e:
-                        print(f"Error creating {name}: {e}")
-
-            # Save the updated list back to the JSON file
-            original_list = getattr(resolver, f"{ctype}_list")
-            save_json(directory, f"{ctype}.json", original_list)
+        import_workspace(client, workspace_path, directory, store=open_store(directory, args.store))
 
         print("\nImport process completed. Local files updated.")
 
@@ -264,6 +411,9 @@ def main():
         traceback.print_exc()
         print(f"\nAn error occurred: {e}")
         sys.exit(1)
+    finally:
+        if args.trace:
+            tracing.finish(args.trace)
 
 if __name__ == "__main__":
     main()
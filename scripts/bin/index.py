@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_index import FleetIndex
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+def print_results(results, as_json: bool):
+    if as_json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    for row in results:
+        line = f"{row['public_id']}\t{row['ctype']}\t{row['name']} ({row['type']})"
+        if row["key"] is not None:
+            line += f"\t{row['key']}={row['value']}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query a fleet-wide search index over exported GTM containers.")
+    parser.add_argument("--db", help="Index database path (defaults to GTM_INDEX_PATH or tmp/gtm_index.sqlite)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Index (or incrementally re-index) exported containers")
+    ingest_parser.add_argument("root", nargs="?", default="tmp", help="Directory containing exported containers (defaults to tmp)")
+    ingest_parser.add_argument("--force", action="store_true", help="Re-read containers even if their files are unchanged")
+
+    query_parser = subparsers.add_parser("query", help="Search the index")
+    query_parser.add_argument("--text", help="Full-text phrase anywhere in an entity (e.g. document.cookie)")
+    query_parser.add_argument("--value", help="Parameter value (e.g. G-ABCDEFG)")
+    query_parser.add_argument("--key", help="Parameter key (e.g. measurementIdOverride)")
+    query_parser.add_argument("--contains", action="store_true", help="Match --value as a substring instead of exactly")
+    query_parser.add_argument("--uses-variable", help="Entities referencing {{Variable Name}}")
+    query_parser.add_argument("--uses-trigger", help="Tags firing or blocked by the trigger with this name")
+    query_parser.add_argument("--ctype", choices=["tags", "triggers", "variables"], help="Restrict to one component type")
+    query_parser.add_argument("--type", dest="entity_type", help="Restrict to a GTM type (e.g. html, jsm, gaawe)")
+    query_parser.add_argument("--limit", type=int, default=1000, help="Maximum number of results")
+    query_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    subparsers.add_parser("stats", help="Show index size")
+
+    args = parser.parse_args()
+    index = FleetIndex(args.db)
+    try:
+        if args.command == "ingest":
+            if not os.path.isdir(args.root):
+                print(f"Error: Directory not found: {args.root}")
+                sys.exit(1)
+            start = time.perf_counter()
+            stats = index.ingest(args.root, force=args.force)
+            print(f"Indexed {stats['containers']} container(s), skipped {stats['skipped']} unchanged, "
+                  f"removed {stats['removed']}; {stats['entities_written']} entities written, "
+                  f"{stats['entities_deleted']} deleted in {time.perf_counter() - start:.2f}s")
+        elif args.command == "query":
+            criteria = [args.text, args.value, args.key, args.uses_variable, args.uses_trigger, args.entity_type]
+            if all(c is None for c in criteria):
+                print("Error: Provide at least one of --text, --value, --key, --uses-variable, --uses-trigger or --type")
+                sys.exit(1)
+            start = time.perf_counter()
+            results = index.search(
+                text=args.text, value=args.value, key=args.key,
+                uses_variable=args.uses_variable, uses_trigger=args.uses_trigger,
+                ctype=args.ctype, entity_type=args.entity_type,
+                contains=args.contains, limit=args.limit
+            )
+            print_results(results, args.json)
+            if not args.json:
+                print(f"\n{len(results)} result(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        else:
+            print(json.dumps(index.stats(), indent=2))
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import gzip
+import json
+import time
+import argparse
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_trigger_engine import TriggerEngine, read_records
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+def open_corpus(path: str):
+    """
+    Opens a recorded corpus for streaming ('-' for stdin, .gz supported).
+    """
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded dataLayer events and page URLs against exported triggers offline.")
+    parser.add_argument("--directory", required=True, help="Exported container directory (tags.json, triggers.json, variables.json)")
+    parser.add_argument("--events", required=True, help="JSON Lines corpus of page records / dataLayer pushes ('-' for stdin, .gz supported)")
+    parser.add_argument("--output", help="Write one JSON line per evaluated event to this file ('-' for stdout)")
+    parser.add_argument("--only-fired", action="store_true", help="Only write events on which at least one tag fires")
+    parser.add_argument("--strict", action="store_true", help="Stop at the first corpus line that is not valid JSON instead of skipping it")
+    parser.add_argument("--no-lifecycle", action="store_true", help="Do not emit gtm.init_consent/gtm.init/gtm.js/gtm.dom/gtm.load for page records (corpus already contains them)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: Directory not found: {args.directory}")
+        sys.exit(1)
+
+    engine = TriggerEngine.from_directory(args.directory)
+    output = None
+    if args.output == "-":
+        output = sys.stdout
+    elif args.output:
+        output = open(args.output, "w", encoding="utf-8")
+
+    tag_counts = {}
+    events = 0
+    skipped = []
+    start = time.perf_counter()
+    try:
+        with open_corpus(args.events) as corpus:
+            for result in engine.replay(read_records(corpus, args.strict, skipped), auto_lifecycle=not args.no_lifecycle):
+                events += 1
+                for name in result["tags"]:
+                    tag_counts[name] = tag_counts.get(name, 0) + 1
+                if output and (result["tags"] or not args.only_fired):
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if output and output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    report = sys.stderr if output is sys.stdout else sys.stdout
+    print(f"Evaluated {events} events in {elapsed:.2f}s ({events / elapsed * 60 if elapsed else 0:,.0f} events/min)", file=report)
+    if skipped:
+        print(f"Skipped {len(skipped)} line(s) that are not valid JSON (first at line {skipped[0]})", file=report)
+    print("\nTag firings:", file=report)
+    for name, count in sorted(tag_counts.items(), key=lambda kv: -kv[1]):
+        print(f"  {count:>10}  {name}", file=report)
+    never = [t.get("name") for t in engine.tags if t.get("name") not in tag_counts]
+    if never:
+        print("\nTags that never fired:", file=report)
+        for name in never:
+            print(f"  {name}", file=report)
+    if engine.unsupported:
+        print("\nNot evaluated offline (treated as undefined / never matching):", file=report)
+        for key, count in sorted(engine.unsupported.items()):
+            print(f"  {key} ({count})", file=report)
+
+if __name__ == "__main__":
+    main()
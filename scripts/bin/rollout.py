@@ -0,0 +1,99 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from gtm_client import GTMClient
+    from gtm_rollout import DEFAULT_BURST, DEFAULT_RATE, DEFAULT_WORKERS, failed_targets, load_change_set, merge_results, read_targets, rollout, summarize
+    from helpers.env_loader import load_env_file
+    # Same module instances as gtm_client uses (helpers/ is on sys.path after importing it)
+    from http_client import HTTPClient
+    from rate_limiter import RateLimiter
+except ImportError as e:
+    print(f"Error: Could not import necessary modules: {e}")
+    sys.exit(1)
+
+DEFAULT_REPORT_PATH = os.path.join("tmp", "rollout_report.json")
+
+def print_result(result, done: int, total: int):
+    summary = result["summary"] or {}
+    if result["status"] == "failed":
+        detail = result["error"] or f"errors: {', '.join(summary.get('errors', []))}"
+    else:
+        detail = f"{len(summary['created'])} created, {len(summary['updated'])} updated, {len(summary['skipped'])} unchanged"
+    print(f"[{done}/{total}] {result['status'].upper():<7} {result['url']} ({detail}; {result['seconds']}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply one change set (tags, triggers, variables) to many GTM workspaces concurrently.")
+    parser.add_argument("--directory", required=True, help="Change-set directory in the export layout (e.g. a diff.py --patch output)")
+    parser.add_argument("--targets", help="File with one GTM workspace URL per line (# comments allowed)")
+    parser.add_argument("--url", action="append", default=[], help="GTM workspace URL (repeatable)")
+    parser.add_argument("--retry-failed", metavar="REPORT", help="Only run the targets that failed in a previous report")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Targets processed concurrently (default {DEFAULT_WORKERS})")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("GTM_RATE_LIMIT", DEFAULT_RATE)), help=f"Maximum API requests per second across all targets (defaults to GTM_RATE_LIMIT or {DEFAULT_RATE})")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help=f"Requests allowed in a burst before --rate applies (default {DEFAULT_BURST})")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be created or updated in each target")
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH, help=f"Where to write the per-target report (default {DEFAULT_REPORT_PATH})")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: Directory not found: {args.directory}")
+        sys.exit(1)
+
+    targets = list(args.url)
+    if args.targets:
+        targets.extend(read_targets(args.targets))
+    previous = []
+    if args.retry_failed:
+        with open(args.retry_failed, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get("targets", [])
+        targets.extend(failed_targets({"targets": previous}))
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        print("Error: No targets. Use --targets, --url or --retry-failed.")
+        sys.exit(1)
+
+    load_env_file()
+    # Authenticate once; every target client reuses the access token
+    auth_client = GTMClient()
+    auth_client._refresh_access_token()
+    limiter = RateLimiter(args.rate, args.burst)
+    HTTPClient.enable_connection_pool(max_idle_per_host=max(1, args.workers))
+
+    def client_factory():
+        return GTMClient(access_token=auth_client.access_token, rate_limiter=limiter)
+
+    change_set = load_change_set(args.directory)
+    print(f"Rolling out {args.directory} to {len(targets)} workspace(s) "
+          f"({args.workers} concurrent, {args.rate:g} requests/s){' [dry run]' if args.dry_run else ''}")
+
+    done = [0]
+    def on_result(result):
+        done[0] += 1
+        print_result(result, done[0], len(targets))
+
+    start = time.perf_counter()
+    results = rollout(change_set, targets, client_factory, args.workers, args.dry_run, on_result)
+    counts = summarize(results)
+    # A retry keeps the earlier results of the targets it did not re-run
+    report_targets = merge_results(previous, results)
+
+    report_dir = os.path.dirname(args.report)
+    if report_dir and not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({"directory": args.directory, "dry_run": args.dry_run, "counts": summarize(report_targets), "targets": report_targets}, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{counts['success']} succeeded, {counts['skipped']} unchanged, {counts['failed']} failed "
+          f"in {time.perf_counter() - start:.1f}s. Report: {args.report}")
+    if counts["failed"]:
+        print(f"Retry the failed targets with: python scripts/bin/rollout.py --directory {args.directory} --retry-failed {args.report}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import os
+import re
+import sys
+import json
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Add path for helpers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'helpers')))
+from gtm_utils import clean_item
+from entity_store import open_store, stored_backend
+
+COMPONENT_FILES = ["tags", "triggers", "variables", "built_in_variables"]
+
+# Matches {{Variable Name}} references inside any string value
+VARIABLE_REF_PATTERN = re.compile(r"\{\{([^{}]+)\}\}")
+
+# Checkpoint 1: PII in URL parameters, plain email addresses, and form fields read by tags or variables
+PII_URL_PARAM_PATTERN = re.compile(r"[?&;]((?:e-?mail|phone|tel|address|(?:first_?|last_?|full_?|user_?)?name))=", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b")
+PII_FIELD_PATTERN = re.compile(r"(?:input|textarea|\[name|\[id|#|getElementById\(|getElementsByName\()[^\n]{0,40}?(e-?mail|password|passwd|phone|\btel\b)", re.IGNORECASE)
+HASHING_PATTERN = re.compile(r"sha-?256|hash", re.IGNORECASE)
+# DOM Element variables name the element directly (e.g. elementId "email")
+DOM_ELEMENT_VARIABLE = "d"
+PII_NAME_PATTERN = re.compile(r"e-?mail|password|passwd|phone|\btel\b", re.IGNORECASE)
+
+# Checkpoint 8: GTM limits containers by bytes (about 200 KB), not by entity count.
+# The estimate is the JSON size of the tags, triggers and variables, so warn early.
+CONTAINER_SIZE_LIMIT = 200 * 1024
+CONTAINER_SIZE_WARNING = 0.7
+SCRIPT_SIZE_WARNING = 10 * 1024
+SCRIPT_COUNT_WARNING = 20
+# Parameter holding the code of Custom HTML tags and Custom JavaScript variables
+SCRIPT_PARAMETERS = {("tags", "html"): "html", ("variables", "jsm"): "javascript"}
+
+# Checkpoint 5: IDs that belong in a variable (GA4, Google tag, Google Ads, Floodlight, Universal Analytics)
+MEASUREMENT_ID_PATTERN = re.compile(r"\b(?:G|GT|AW|DC)-[A-Z0-9]{6,12}\b|\bUA-\d{4,10}-\d{1,4}\b")
+DRY_MIN_REPEATS = 3
+
+def load_container(directory: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Loads the exported JSON files of one container, or its entities.sqlite for
+    exports made with --store sqlite. Missing component types are treated as empty.
+    """
+    if stored_backend(directory) == "sqlite":
+        with closing(open_store(directory, "sqlite")) as store:
+            return {ctype: store.load(ctype) for ctype in COMPONENT_FILES}
+    container = {}
+    for ctype in COMPONENT_FILES:
+        path = os.path.join(directory, f"{ctype}.json")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                container[ctype] = json.load(f)
+        else:
+            container[ctype] = []
+    return container
+
+def iter_strings(obj: Any) -> Iterator[str]:
+    """
+    Yields every string value nested anywhere in obj.
+    """
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from iter_strings(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from iter_strings(value)
+
+def iter_parameters(parameters: List[Dict[str, Any]], parent_key: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Flattens a GTM parameter list (including nested list/map parameters)
+    into (key, value) postings. Map entries inherit the key of their parent list.
+    """
+    for param in parameters or []:
+        key = param.get("key") or parent_key
+        if "value" in param:
+            yield key, str(param["value"])
+        if param.get("list"):
+            yield from iter_parameters(param["list"], key)
+        if param.get("map"):
+            yield from iter_parameters(param["map"], key)
+
+def script_code(ctype: str, item: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the code of a Custom HTML tag or Custom JavaScript variable, None for other entities.
+    """
+    key = SCRIPT_PARAMETERS.get((ctype, item.get("type")))
+    if key is None:
+        return None
+    for param in item.get("parameter", []):
+        if param.get("key") == key:
+            return str(param.get("value", ""))
+    return ""
+
+def chained_tag_names(tag: Dict[str, Any], chain: str) -> List[str]:
+    """
+    Returns the tag names referenced by setupTag or teardownTag.
+    The API uses a list of {"tagName": ...}; a single object is accepted too.
+    """
+    refs = tag.get(chain) or []
+    if isinstance(refs, dict):
+        refs = [refs]
+    return [ref.get("tagName") for ref in refs if ref.get("tagName")]
+
+def content_key(item: Dict[str, Any]) -> str:
+    """
+    Returns a canonical representation of an item's settings, ignoring its
+    name, notes and read-only metadata. Equal keys mean duplicated settings.
+    """
+    cleaned = clean_item(item)
+    cleaned.pop("name", None)
+    cleaned.pop("notes", None)
+    return json.dumps(cleaned, sort_keys=True, ensure_ascii=False)
+
+def find_duplicates(container: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Checkpoint 3: components of the same type with identical settings.
+    """
+    findings = []
+    for ctype in ["tags", "triggers", "variables"]:
+        groups: Dict[str, List[str]] = {}
+        for item in container.get(ctype, []):
+            groups.setdefault(content_key(item), []).append(item.get("name"))
+        for names in groups.values():
+            if len(names) > 1:
+                findings.append({
+                    "check": "duplication",
+                    "type": ctype,
+                    "names": names,
+                    "message": f"{len(names)} {ctype} share identical settings",
+                })
+    return findings
+
+def find_unused(container: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Checkpoint 4: triggers and variables nobody references, and tags without firing triggers.
+    """
+    findings = []
+    tags = container.get("tags", [])
+    triggers = container.get("triggers", [])
+    variables = container.get("variables", [])
+
+    used_triggers = set()
+    chained_tags = set()
+    for tag in tags:
+        used_triggers.update(str(t) for t in tag.get("firingTriggerId", []))
+        used_triggers.update(str(t) for t in tag.get("blockingTriggerId", []))
+        for chain in ("setupTag", "teardownTag"):
+            chained_tags.update(chained_tag_names(tag, chain))
+
+    used_variables = set()
+    for item in tags + triggers + variables:
+        for value in iter_strings(clean_item(item)):
+            used_variables.update(VARIABLE_REF_PATTERN.findall(value))
+
+    for trigger in triggers:
+        if str(trigger.get("triggerId")) not in used_triggers and trigger.get("name") not in used_triggers:
+            findings.append({
+                "check": "unused",
+                "type": "triggers",
+                "names": [trigger.get("name")],
+                "message": "Trigger is not referenced by any tag",
+            })
+    for variable in variables:
+        if variable.get("name") not in used_variables:
+            findings.append({
+                "check": "unused",
+                "type": "variables",
+                "names": [variable.get("name")],
+                "message": "Variable is not referenced by any tag, trigger or variable",
+            })
+    for tag in tags:
+        if not tag.get("firingTriggerId") and tag.get("name") not in chained_tags:
+            findings.append({
+                "check": "unused",
+                "type": "tags",
+                "names": [tag.get("name")],
+                "message": "Tag has no firing triggers",
+            })
+    return findings
+
+def find_pii(container: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Checkpoint 1: tags and variables that may send or read PII. Values may be
+    hashed on the tag side, so findings are candidates for review.
+    """
+    findings = []
+    for ctype in ["tags", "variables"]:
+        for item in container.get(ctype, []):
+            # One pass per pattern over all strings; the cheap tests skip most entities
+            text = "\n".join(iter_strings(clean_item(item)))
+            reasons = []
+            if "=" in text:
+                reasons.extend(f"{m.group(1)}= URL parameter" for m in PII_URL_PARAM_PATTERN.finditer(text))
+            if "@" in text:
+                reasons.extend(f"email address {m.group(0)}" for m in EMAIL_PATTERN.finditer(text))
+            if PII_NAME_PATTERN.search(text):
+                reasons.extend(f"{m.group(1)} form field" for m in PII_FIELD_PATTERN.finditer(text))
+            if ctype == "variables" and item.get("type") == DOM_ELEMENT_VARIABLE:
+                for _, value in iter_parameters(item.get("parameter")):
+                    reasons.extend(f"{m.group(0)} element" for m in PII_NAME_PATTERN.finditer(value))
+            if not reasons:
+                continue
+            reasons = list(dict.fromkeys(reasons))
+            hashed = HASHING_PATTERN.search(text) is not None
+            findings.append({
+                "check": "pii",
+                "type": ctype,
+                "names": [item.get("name")],
+                "message": f"Possible PII: {', '.join(reasons[:3])}{' ...' if len(reasons) > 3 else ''}"
+                           + (" (hashing is mentioned; verify)" if hashed else ""),
+            })
+    return findings
+
+def container_size(container: Dict[str, List[Dict[str, Any]]]) -> int:
+    """
+    Estimated container size in bytes: compact JSON of tags, triggers and variables without read-only fields.
+    """
+    return sum(
+        len(json.dumps(clean_item(item), ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        for ctype in ["tags", "triggers", "variables"] for item in container.get(ctype, [])
+    )
+
+def find_size(container: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Checkpoint 8: large scripts, many scripts, and containers approaching the size limit.
+    """
+    findings = []
+    scripts = []
+    for ctype in ["tags", "variables"]:
+        for item in container.get(ctype, []):
+            code = script_code(ctype, item)
+            if code is None:
+                continue
+            size = len(code.encode("utf-8"))
+            scripts.append((item.get("name"), size))
+            if size > SCRIPT_SIZE_WARNING:
+                findings.append({
+                    "check": "size",
+                    "type": ctype,
+                    "names": [item.get("name")],
+                    "message": f"{size / 1024:.1f} KB of code",
+                })
+    if len(scripts) > SCRIPT_COUNT_WARNING:
+        findings.append({
+            "check": "size",
+            "type": "container",
+            "names": [name for name, _ in sorted(scripts, key=lambda s: s[1], reverse=True)[:5]],
+            "message": f"{len(scripts)} Custom HTML tags / Custom JavaScript variables "
+                       f"({sum(size for _, size in scripts) / 1024:.1f} KB of code; largest listed)",
+        })
+    total = container_size(container)
+    if total > CONTAINER_SIZE_LIMIT * CONTAINER_SIZE_WARNING:
+        findings.append({
+            "check": "size",
+            "type": "container",
+            "names": [],
+            "message": f"Estimated size {total / 1024:.0f} KB ({total / CONTAINER_SIZE_LIMIT:.0%} of the {CONTAINER_SIZE_LIMIT // 1024} KB limit)",
+        })
+    return findings
+
+def hardcoded_ids(tag: Dict[str, Any]) -> List[str]:
+    """
+    Measurement / conversion IDs written literally in a tag (not through a variable).
+    """
+    found = []
+    for value in iter_strings(tag.get("parameter", [])):
+        found.extend(MEASUREMENT_ID_PATTERN.findall(value))
+    return list(dict.fromkeys(found))
+
+def find_dry(container: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Checkpoint 5: measurement IDs hard-coded in several tags, literal parameter
+    values repeated across tags, and trigger conditions repeated across triggers.
+    """
+    findings = []
+    tags = container.get("tags", [])
+
+    by_id: Dict[str, List[str]] = {}
+    for tag in tags:
+        for measurement_id in hardcoded_ids(tag):
+            by_id.setdefault(measurement_id, []).append(tag.get("name"))
+    for measurement_id, names in by_id.items():
+        if len(names) > 1:
+            findings.append({
+                "check": "dry",
+                "type": "tags",
+                "names": names,
+                "message": f"{measurement_id} is hard-coded in {len(names)} tags; use a Constant variable",
+            })
+
+    by_value: Dict[Tuple[str, str], List[str]] = {}
+    for tag in tags:
+        for key, value in set(iter_parameters(tag.get("parameter"))):
+            if (len(value) < 4 or value in ("true", "false") or VARIABLE_REF_PATTERN.fullmatch(value)
+                    or MEASUREMENT_ID_PATTERN.search(value) or SCRIPT_PARAMETERS.get(("tags", tag.get("type"))) == key):
+                continue
+            by_value.setdefault((key, value), []).append(tag.get("name"))
+    for (key, value), names in by_value.items():
+        if len(names) >= DRY_MIN_REPEATS:
+            shown = value if len(value) <= 40 else value[:37] + "..."
+            findings.append({
+                "check": "dry",
+                "type": "tags",
+                "names": names,
+                "message": f"{key} = '{shown}' is repeated in {len(names)} tags",
+            })
+
+    by_condition: Dict[str, List[str]] = {}
+    for trigger in container.get("triggers", []):
+        for field in ("filter", "customEventFilter", "autoEventFilter"):
+            for condition in trigger.get(field, []):
+                key = json.dumps(condition, sort_keys=True, ensure_ascii=False)
+                names = by_condition.setdefault(key, [])
+                if trigger.get("name") not in names:
+                    names.append(trigger.get("name"))
+    for key, names in by_condition.items():
+        if len(names) >= DRY_MIN_REPEATS:
+            condition = json.loads(key)
+            args = [p.get("value") for p in condition.get("parameter", [])]
+            findings.append({
+                "check": "dry",
+                "type": "triggers",
+                "names": names,
+                "message": f"Condition {condition.get('type')} {' '.join(str(a) for a in args)} is repeated in {len(names)} triggers; "
+                           "consider a variable (e.g. a Lookup Table or RegEx Table)",
+            })
+    return findings
+
+AUDIT_CHECKS = [find_duplicates, find_unused, find_pii, find_size, find_dry]
+
+def run_checks(container: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Runs every automated audit check against one loaded container.
+    """
+    findings = []
+    for check in AUDIT_CHECKS:
+        findings.extend(check(container))
+    return findings
+
+def audit_directory(directory: str) -> Dict[str, Any]:
+    """
+    Runs the automated audit checks against one exported container directory.
+    """
+    container = load_container(directory)
+    return {
+        "directory": directory,
+        "counts": {ctype: len(items) for ctype, items in container.items()},
+        "findings": run_checks(container),
+    }
@@ -1,12 +1,20 @@
 import os
+import re
 import json
 import sys
+import time
 from typing import Dict, List, Optional
 from authentication import refresh_access_token
 
 # Add path for helpers
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'helpers')))
 from http_client import HTTPClient
+from rate_limiter import RateLimiter
+from response_cache import DEFAULT_CACHE_DIRECTORY, DEFAULT_MAX_BYTES, credential_scope
+import tracing
+
+# Container part and optional workspace part of an API URL (for cache invalidation)
+SCOPE_PATTERN = re.compile(r"^(.*?/accounts/[^/?:]+/containers/[^/?:]+)(/workspaces/[^/?:]+)?")
 
 class GTMClient:
     """
@@ -20,15 +28,35 @@ class GTMClient:
         refresh_token: Optional[str] = None,
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
-        access_token: Optional[str] = None
+        access_token: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         self.refresh_token = refresh_token or os.getenv("GTM_REFRESH_TOKEN")
         self.client_id = client_id or os.getenv("GTM_CLIENT_ID")
         self.client_secret = client_secret or os.getenv("GTM_CLIENT_SECRET")
         self.access_token = access_token # Can be None initially
+        # Optional limiter shared between clients running concurrently (see bin/rollout.py)
+        self.rate_limiter = rate_limiter
         self.headers = {
             "Content-Type": "application/json"
         }
+        # Opt-in on-disk cache of GET responses: GTM_HTTP_CACHE=1 (default
+        # directory) or GTM_HTTP_CACHE=<directory>
+        cache_setting = os.getenv("GTM_HTTP_CACHE")
+        if HTTPClient.cache is None and cache_setting and cache_setting.lower() not in ("0", "false", "no"):
+            directory = DEFAULT_CACHE_DIRECTORY if cache_setting.lower() in ("1", "true", "yes") else cache_setting
+            max_bytes = int(float(os.getenv("GTM_HTTP_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024)
+            HTTPClient.enable_response_cache(directory, max_bytes)
+
+    @property
+    def cache_scope(self) -> str:
+        """
+        Scope of this client's cached responses: its OAuth client and refresh
+        token, or the access token when the client was given only that.
+        """
+        if self.refresh_token or self.client_id:
+            return credential_scope(self.client_id, self.refresh_token)
+        return credential_scope(self.access_token)
 
     def _refresh_access_token(self):
         """
@@ -51,23 +79,52 @@ class GTMClient:
         headers["Authorization"] = f"Bearer {self.access_token}"
         return headers
 
+    def _invalidate_cache(self, url: str):
+        """
+        Drops the cached responses a write to url may have made stale: the
+        whole workspace for writes inside a workspace, the whole container for
+        writes to the container itself (e.g. creating or deleting a workspace).
+        """
+        if HTTPClient.cache is None:
+            return
+        match = SCOPE_PATTERN.match(url)
+        if match is None:
+            HTTPClient.cache.invalidate(url.split("?", 1)[0])
+        elif match.group(2) and len(url) > match.end() and url[match.end()] == "/":
+            HTTPClient.cache.invalidate(match.group(0))
+        else:
+            HTTPClient.cache.invalidate(match.group(1))
+
     def _request(self, method: str, path: str, **kwargs) -> Dict:
         """
         Centralized request handler with automatic token refresh on 401.
         """
         url = f"{self.BASE_URL}/{path.lstrip('/')}"
+        active = tracing.tracer
+        if active is not None:
+            start = time.perf_counter()
+        throttle_wait = self.rate_limiter.acquire() if self.rate_limiter is not None else 0.0
         
         # Try request
-        response = HTTPClient.request(method, url, headers=self._get_headers(), **kwargs)
+        response = HTTPClient.request(method, url, headers=self._get_headers(), cache_scope=self.cache_scope, **kwargs)
+        retries = 0
         
         if response.status_code == 401:
             # Token might be expired, refresh and retry once
             self._refresh_access_token()
-            response = HTTPClient.request(method, url, headers=self._get_headers(), **kwargs)
-            
+            if self.rate_limiter is not None:
+                throttle_wait += self.rate_limiter.acquire()
+            response = HTTPClient.request(method, url, headers=self._get_headers(), cache_scope=self.cache_scope, **kwargs)
+            retries = 1
+
+        if method != "GET":
+            self._invalidate_cache(url)
+        if active is not None:
+            active.record_request("api", method, url, response.status_code, start, time.perf_counter() - start,
+                                  retries=retries, throttle_wait=throttle_wait)
         response.raise_for_status()
         
-        if method == "DELETE":
+        if method == "DELETE" or not response.content:
             return {}
         return response.json()
 
@@ -145,6 +202,38 @@ class GTMClient:
         """
         return self._get(workspace_path)
 
+    def get_workspace_status(self, workspace_path: str) -> Dict:
+        """
+        Gets the changes of a workspace relative to its base container version.
+        Returns {"workspaceChange": [...], "mergeConflict": [...]} where each change
+        holds one entity (tag, trigger, variable, ...) and its changeStatus
+        ("added", "updated", "deleted" or "none").
+        Endpoint: GET /{workspace_path}/status
+        """
+        return self._get(f"{workspace_path}/status")
+
+    # Container Versions
+    def get_container_version(self, version_path: str) -> Dict:
+        """
+        Gets a container version including all its tags, triggers and variables.
+        version_path: e.g., 'accounts/12345/containers/67890/versions/3'
+        """
+        return self._get(version_path)
+
+    def get_live_version(self, container_path: str) -> Dict:
+        """
+        Gets the currently published container version.
+        Endpoint: GET /{container_path}/versions:live
+        """
+        return self._get(f"{container_path}/versions:live")
+
+    def get_latest_version_header(self, container_path: str) -> Dict:
+        """
+        Gets the header (ID, name, counts) of the latest container version.
+        Endpoint: GET /{container_path}/version_headers:latest
+        """
+        return self._get(f"{container_path}/version_headers:latest")
+
     def list_tags(self, workspace_path: str, page_token: Optional[str] = None) -> List[Dict]:
         """
         Lists all tags in a workspace.
@@ -175,6 +264,24 @@ class GTMClient:
             return variables + self.list_variables(workspace_path, data["nextPageToken"])
         return variables
 
+    def get_tag(self, tag_path: str) -> Dict:
+        """
+        Gets a single tag.
+        """
+        return self._get(tag_path)
+
+    def get_trigger(self, trigger_path: str) -> Dict:
+        """
+        Gets a single trigger.
+        """
+        return self._get(trigger_path)
+
+    def get_variable(self, variable_path: str) -> Dict:
+        """
+        Gets a single variable.
+        """
+        return self._get(variable_path)
+
     # Write operations for Tags
     def create_tag(self, workspace_path: str, tag_body: Dict) -> Dict:
         """
@@ -249,44 +356,17 @@ class GTMClient:
         Enables one or more built-in variables in a workspace.
         variable_types: List of built-in variable types (e.g., ['pageUrl', 'clickElement'])
         """
-        # Create query parameters for multiple types if needed
-        # The API expects type[]=pageUrl&type[]=clickElement
+        # The API expects type=pageUrl&type=clickElement, hence a list of pairs
         params = [("type", t) for t in variable_types]
-        
-        # We need to use the lower level _request to handle multiple params with same key
-        url = f"{self.BASE_URL}/{workspace_path.lstrip('/')}/built_in_variables"
-        response = HTTPClient.request("POST", url, headers=self._get_headers(), params=params)
-        
-        if response.status_code == 401:
-            self._refresh_access_token()
-            response = HTTPClient.request("POST", url, headers=self._get_headers(), params=params)
-            
-        response.raise_for_status()
-        data = response.json()
+        data = self._request("POST", f"{workspace_path}/built_in_variables", params=params)
         return data.get("builtInVariable", [])
 
     def revert_built_in_variable(self, workspace_path: str, variable_type: str) -> Dict:
         """
         Disables (reverts) a built-in variable in a workspace.
         """
-        path = f"{workspace_path}/built_in_variables:revert"
-        # The API expects a single type parameter for revert
-        params = {"type": variable_type}
-        
-        # We use _request but we need to pass params correctly
-        url = f"{self.BASE_URL}/{path.lstrip('/')}"
-        response = HTTPClient.request("POST", url, headers=self._get_headers(), params=params)
-        
-        if response.status_code == 401:
-            self._refresh_access_token()
-            response = HTTPClient.request("POST", url, headers=self._get_headers(), params=params)
-            
-        response.raise_for_status()
-        # Revert usually returns 204 No Content or similar, but let's try to return JSON if any
-        try:
-            return response.json()
-        except:
-            return {}
+        # The API expects a single type parameter for revert; the response is usually empty
+        return self._request("POST", f"{workspace_path}/built_in_variables:revert", params={"type": variable_type})
 
 
 if __name__ == "__main__":
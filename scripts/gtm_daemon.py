@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import socket
+import tempfile
+import threading
+import socketserver
+from contextlib import closing
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from gtm_client import GTMClient
+from gtm_audit import audit_directory
+
+# Add path for helpers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'helpers')))
+from http_client import HTTPClient
+from gtm_utils import parse_gtm_workspace_url, resolve_gtm_path, load_script
+from entity_store import open_store
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+def default_socket_path() -> str:
+    """
+    Returns the Unix socket path used by the daemon.
+    GTM_DAEMON_SOCKET overrides the per-user default in the temp directory.
+    """
+    path = os.getenv("GTM_DAEMON_SOCKET")
+    if path:
+        return path
+    return os.path.join(tempfile.gettempdir(), f"gtm-copilot-{os.getuid()}.sock")
+
+class RPCError(Exception):
+    """
+    Error returned to the caller as a JSON-RPC error object.
+    """
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+class GTMDaemon:
+    """
+    Keeps an authenticated GTMClient, pooled HTTP connections and per-workspace
+    state (container public ID, registry of remote entities) warm between agent
+    turns. Operations are exposed as JSON-RPC methods over a local Unix socket.
+    """
+    def __init__(self, client: GTMClient, socket_path: Optional[str] = None):
+        self.client = client
+        self.socket_path = socket_path or default_socket_path()
+        self.workspaces: Dict[str, Dict[str, Any]] = {}
+        self._workspaces_lock = threading.Lock()
+        self._server: Optional[socketserver.UnixStreamServer] = None
+
+        HTTPClient.enable_connection_pool()
+        self._export = load_script("export")
+        self._import = load_script("import")
+
+        self.methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "ping": self.rpc_ping,
+            "status": self.rpc_status,
+            "export": self.rpc_export,
+            "import": self.rpc_import,
+            "plan": self.rpc_plan,
+            "audit": self.rpc_audit,
+            "invalidate": self.rpc_invalidate,
+            "shutdown": self.rpc_shutdown,
+        }
+
+    def _paths(self, params: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Returns the container and workspace paths addressed by params
+        (url or account/container/workspace).
+        """
+        ids = {
+            "account_id": params.get("account"),
+            "container_id": params.get("container"),
+            "workspace_id": params.get("workspace"),
+        }
+        if params.get("url"):
+            parsed = parse_gtm_workspace_url(params["url"])
+            if not parsed:
+                raise RPCError(INVALID_PARAMS, f"Could not parse GTM URL: {params['url']}")
+            ids = parsed
+        if not all(ids.values()):
+            raise RPCError(INVALID_PARAMS, "Account, Container, and Workspace IDs are required (via url or individual params)")
+
+        container_path = f"accounts/{ids['account_id']}/containers/{ids['container_id']}"
+        return container_path, f"{container_path}/workspaces/{ids['workspace_id']}"
+
+    def _workspace(self, params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Resolves the workspace addressed by params and returns its path and
+        cached state, fetching the container once.
+        """
+        container_path, workspace_path = self._paths(params)
+        with self._workspaces_lock:
+            state = self.workspaces.get(workspace_path)
+            if state is None:
+                # registry: remote entities by type and name, reused by import and plan
+                state = {"lock": threading.Lock(), "public_id": None, "container_path": container_path, "registry": None}
+                self.workspaces[workspace_path] = state
+
+        if state["public_id"] is None:
+            container_info = self.client.get_container(container_path)
+            state["public_id"] = container_info.get("publicId", f"GTM-{container_path.rsplit('/', 1)[-1]}")
+        return workspace_path, state
+
+    def _directory(self, params: Dict[str, Any], state: Dict[str, Any]) -> str:
+        return resolve_gtm_path(params.get("directory"), state["public_id"])
+
+    def rpc_ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"pid": os.getpid()}
+
+    def rpc_status(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        with self._workspaces_lock:
+            workspaces = list(self.workspaces.items())
+        return {
+            "pid": os.getpid(),
+            "socket": self.socket_path,
+            "authenticated": bool(self.client.access_token),
+            "workspaces": {
+                path: {
+                    "public_id": state["public_id"],
+                    "container_path": state["container_path"],
+                    "registry": None if state["registry"] is None else {ctype: len(items) for ctype, items in state["registry"].items()},
+                }
+                for path, state in workspaces
+            },
+        }
+
+    def rpc_export(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        workspace_path, state = self._workspace(params)
+        directory = self._directory(params, state)
+        if params.get("delta") and not params.get("base_version"):
+            raise RPCError(INVALID_PARAMS, "delta requires base_version (the version the workspace was created from)")
+        with state["lock"], closing(open_store(directory, params.get("store"))) as store:
+            if params.get("delta"):
+                counts = self._export.export_workspace_delta(self.client, workspace_path, directory, params["base_version"], store=store)
+            else:
+                counts = self._export.export_workspace(self.client, workspace_path, directory, store=store)
+        return {"workspace": workspace_path, "directory": directory, "counts": counts}
+
+    def _sync(self, params: Dict[str, Any], dry_run: bool) -> Dict[str, Any]:
+        workspace_path, state = self._workspace(params)
+        directory = self._directory(params, state)
+        if not os.path.exists(directory):
+            raise RPCError(INVALID_PARAMS, f"Directory not found: {directory}")
+        with state["lock"], closing(open_store(directory, params.get("store"))) as store:
+            # The registry is set aside while in use, so a failed import leaves none behind
+            registry, state["registry"] = state["registry"], None
+            resolver = self._import.GTMDependencyResolver(self.client, workspace_path, directory, dry_run=dry_run,
+                                                          store=store, remote_registry=registry)
+            summary = self._import.sync_workspace(resolver)
+            # The resolver mirrors its own writes into the registry; after errors
+            # the remote state is uncertain, so the next call fetches it again
+            if not summary["errors"]:
+                state["registry"] = resolver.remote_registry
+        return {"workspace": workspace_path, "directory": directory, "summary": summary}
+
+    def rpc_import(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._sync(params, dry_run=False)
+
+    def rpc_plan(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._sync(params, dry_run=True)
+
+    def rpc_audit(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        directory = params.get("directory")
+        if not directory or params.get("url") or params.get("workspace"):
+            _, state = self._workspace(params)
+            directory = self._directory(params, state)
+        if not os.path.exists(directory):
+            raise RPCError(INVALID_PARAMS, f"Directory not found: {directory}")
+        return audit_directory(directory)
+
+    def rpc_invalidate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Drops cached workspace state (all workspaces when no workspace is given),
+        e.g. after the workspace was changed in the GTM UI.
+        """
+        with self._workspaces_lock:
+            if params.get("url") or params.get("workspace"):
+                _, workspace_path = self._paths(params)
+                self.workspaces.pop(workspace_path, None)
+            else:
+                self.workspaces.clear()
+            return {"workspaces": len(self.workspaces)}
+
+    def rpc_shutdown(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        # shutdown() blocks until serve_forever returns, so it must run on another thread
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+        return {"stopping": True}
+
+    def dispatch(self, request: Any) -> Optional[Dict[str, Any]]:
+        """
+        Executes one JSON-RPC request object and returns the response object
+        (None for notifications).
+        """
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or "method" not in request:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": INVALID_REQUEST, "message": "Invalid Request"}}
+
+        request_id = request.get("id")
+        params = request.get("params") or {}
+        try:
+            method = self.methods.get(request["method"])
+            if method is None:
+                raise RPCError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            if not isinstance(params, dict):
+                raise RPCError(INVALID_PARAMS, "params must be an object")
+            result = method(params)
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RPCError as e:
+            response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": e.message}}
+        except Exception as e:
+            print(f"Error in {request.get('method')}: {e}")
+            response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": SERVER_ERROR, "message": str(e)}}
+
+        if "id" not in request:
+            return None
+        return response
+
+    def serve_forever(self):
+        """
+        Listens on the Unix socket until a shutdown request arrives.
+        Messages are newline-delimited JSON-RPC objects.
+        """
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        response = daemon.dispatch(request)
+                    except json.JSONDecodeError:
+                        response = {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": "Parse error"}}
+                    if response is not None:
+                        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                        self.wfile.flush()
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        if os.path.exists(self.socket_path):
+            if is_running(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+
+        # Warm up the OAuth token before accepting requests
+        self.client._get_headers()
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = Server(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+
+        print(f"GTM Copilot daemon listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            if HTTPClient.pool is not None:
+                HTTPClient.pool.close()
+            print("GTM Copilot daemon stopped.")
+
+def call(method: str, params: Optional[Dict[str, Any]] = None, socket_path: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+    """
+    Sends one JSON-RPC request to the daemon and returns its result.
+    Raises RPCError if the daemon answered with an error.
+    """
+    request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or {}}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or default_socket_path())
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as stream:
+            line = stream.readline()
+    if not line:
+        raise RPCError(SERVER_ERROR, "Daemon closed the connection without a response")
+    response = json.loads(line)
+    if "error" in response:
+        raise RPCError(response["error"]["code"], response["error"]["message"])
+    return response.get("result")
+
+def is_running(socket_path: Optional[str] = None) -> bool:
+    """
+    Returns True if a daemon answers ping on the socket.
+    """
+    try:
+        call("ping", socket_path=socket_path, timeout=2)
+        return True
+    except (OSError, RPCError):
+        return False
@@ -0,0 +1,216 @@
+import os
+import json
+from typing import Any, Dict, List, Optional
+
+from gtm_audit import COMPONENT_FILES, load_container
+from gtm_trigger_engine import BUILT_IN_TRIGGERS
+from gtm_utils import clean_item, parse_gtm_workspace_url
+
+DIFF_COMPONENTS = ["variables", "triggers", "tags"]
+ID_FIELDS = {"tags": "tagId", "triggers": "triggerId", "variables": "variableId"}
+TRIGGER_REF_FIELDS = ["firingTriggerId", "blockingTriggerId"]
+CHANGES_FILENAME = "changes.json"
+
+def load_side(spec: str, client=None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Loads one side of a diff: an exported directory, or a live workspace
+    given by its GTM URL (requires a GTMClient).
+    """
+    parsed = parse_gtm_workspace_url(spec)
+    if parsed is None:
+        if not os.path.isdir(spec):
+            raise FileNotFoundError(f"Directory not found: {spec}")
+        return load_container(spec)
+    if client is None:
+        raise ValueError(f"A GTMClient is required to read {spec}")
+    workspace_path = f"accounts/{parsed['account_id']}/containers/{parsed['container_id']}/workspaces/{parsed['workspace_id']}"
+    return {
+        "tags": client.list_tags(workspace_path),
+        "triggers": client.list_triggers(workspace_path),
+        "variables": client.list_variables(workspace_path),
+        "built_in_variables": client.list_built_in_variables(workspace_path),
+    }
+
+def trigger_name_map(container: Dict[str, List[Dict[str, Any]]]) -> Dict[str, str]:
+    """
+    Maps trigger IDs to names. Built-in trigger IDs are the same in every
+    container and are kept as they are.
+    """
+    names = {trigger_id: trigger_id for trigger_id in BUILT_IN_TRIGGERS}
+    for trigger in container.get("triggers", []):
+        if trigger.get("triggerId") is not None:
+            names[str(trigger["triggerId"])] = trigger.get("name")
+    return names
+
+def portable_entity(ctype: str, item: Dict[str, Any], trigger_names: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Returns the entity without read-only fields and with trigger IDs replaced
+    by trigger names, so it can be compared with (or imported into) another container.
+    """
+    portable = clean_item(item)
+    if ctype == "tags":
+        for field in TRIGGER_REF_FIELDS:
+            if field in portable:
+                portable[field] = [trigger_names.get(str(t), str(t)) for t in portable[field]]
+    return portable
+
+def normalize_parameter(param: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts one GTM parameter into a comparable structure: nested map
+    parameters become dicts keyed by parameter key.
+    """
+    normalized = {k: v for k, v in param.items() if k not in ("key", "list", "map")}
+    if "list" in param:
+        normalized["list"] = [normalize_parameter(p) for p in param["list"]]
+    if "map" in param:
+        normalized["map"] = normalize_parameters(param["map"])
+    return normalized
+
+def normalize_parameters(params: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {p.get("key"): normalize_parameter(p) for p in params}
+
+def normalize_entity(ctype: str, item: Dict[str, Any], trigger_names: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Comparable form of an entity: portable, with parameter lists keyed by key
+    and trigger references sorted (their order has no effect).
+    """
+    normalized = portable_entity(ctype, item, trigger_names)
+    if "parameter" in normalized:
+        normalized["parameter"] = normalize_parameters(normalized["parameter"])
+    for field in TRIGGER_REF_FIELDS:
+        if field in normalized:
+            normalized[field] = sorted(normalized[field])
+    return normalized
+
+def quick_key(ctype: str, item: Dict[str, Any], trigger_names: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Portable entity with top-level parameters sorted by key and without its name.
+    Equal keys mean equal entities; unequal keys still need normalize_entity
+    (nested parameter order may differ).
+    """
+    key = portable_entity(ctype, item, trigger_names)
+    key.pop("name", None)
+    if "parameter" in key:
+        key["parameter"] = sorted(key["parameter"], key=lambda p: p.get("key") or "")
+    for field in TRIGGER_REF_FIELDS:
+        if field in key:
+            key[field] = sorted(key[field])
+    return key
+
+def diff_values(old: Any, new: Any, path: str, changes: List[Dict[str, Any]]):
+    """
+    Appends {"field", "old", "new"} entries for every leaf that differs.
+    Missing values are reported as None.
+    """
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in list(old) + [k for k in new if k not in old]:
+            diff_values(old.get(key), new.get(key), f"{path}.{key}" if path else str(key), changes)
+    elif isinstance(old, list) and isinstance(new, list) and all(isinstance(v, dict) for v in old + new):
+        for index in range(max(len(old), len(new))):
+            diff_values(old[index] if index < len(old) else None, new[index] if index < len(new) else None, f"{path}[{index}]", changes)
+    else:
+        changes.append({"field": path, "old": old, "new": new})
+
+def same_container(old: Dict[str, List[Dict[str, Any]]], new: Dict[str, List[Dict[str, Any]]]) -> bool:
+    """
+    True if both sides come from the same GTM container, i.e. entity IDs are comparable.
+    """
+    def container_ids(container):
+        return {item.get("containerId") for ctype in DIFF_COMPONENTS for item in container.get(ctype, [])} - {None}
+    old_ids, new_ids = container_ids(old), container_ids(new)
+    return bool(old_ids) and old_ids == new_ids
+
+def diff_containers(old: Dict[str, List[Dict[str, Any]]], new: Dict[str, List[Dict[str, Any]]],
+                    match_ids: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Computes the changes that turn old into new. Entities are aligned by name;
+    when both sides come from the same container (or match_ids=True), entities
+    left unmatched are aligned by ID and reported as renamed.
+    Returns {ctype: {"added", "removed", "renamed", "modified"}} where modified
+    maps names to per-field changes.
+    """
+    if match_ids is None:
+        match_ids = same_container(old, new)
+    old_triggers, new_triggers = trigger_name_map(old), trigger_name_map(new)
+
+    result: Dict[str, Any] = {}
+    # Triggers are diffed before tags so that renamed triggers do not show up
+    # as changed trigger references in every tag using them
+    for ctype in DIFF_COMPONENTS:
+        old_items = {item.get("name"): item for item in old.get(ctype, [])}
+        new_items = {item.get("name"): item for item in new.get(ctype, [])}
+        added = [name for name in new_items if name not in old_items]
+        removed = [name for name in old_items if name not in new_items]
+        pairs = [(name, name) for name in new_items if name in old_items]
+
+        renamed = {}
+        if match_ids and added and removed:
+            id_field = ID_FIELDS[ctype]
+            removed_by_id = {str(old_items[name].get(id_field)): name for name in removed if old_items[name].get(id_field) is not None}
+            for name in added:
+                old_name = removed_by_id.get(str(new_items[name].get(id_field)))
+                if old_name is not None:
+                    renamed[old_name] = name
+                    pairs.append((old_name, name))
+            renamed_to = set(renamed.values())
+            added = [name for name in added if name not in renamed_to]
+            removed = [name for name in removed if name not in renamed]
+            if ctype == "triggers":
+                for trigger_id, name in old_triggers.items():
+                    old_triggers[trigger_id] = renamed.get(name, name)
+
+        modified = {}
+        for old_name, new_name in pairs:
+            # Cheap check first: most aligned entities are unchanged
+            if quick_key(ctype, old_items[old_name], old_triggers) == quick_key(ctype, new_items[new_name], new_triggers):
+                continue
+            old_item = normalize_entity(ctype, old_items[old_name], old_triggers)
+            new_item = normalize_entity(ctype, new_items[new_name], new_triggers)
+            old_item.pop("name", None)
+            new_item.pop("name", None)
+            if old_item != new_item:
+                changes: List[Dict[str, Any]] = []
+                diff_values(old_item, new_item, "", changes)
+                modified[new_name] = changes
+        result[ctype] = {"added": added, "removed": removed, "renamed": renamed, "modified": modified}
+
+    old_built_ins = {v.get("type") for v in old.get("built_in_variables", [])}
+    new_built_ins = [v.get("type") for v in new.get("built_in_variables", [])]
+    result["built_in_variables"] = {
+        "added": [t for t in new_built_ins if t not in old_built_ins],
+        "removed": sorted(old_built_ins - set(new_built_ins)),
+        "renamed": {},
+        "modified": {},
+    }
+    return result
+
+def count_changes(diff: Dict[str, Any]) -> int:
+    return sum(len(d["added"]) + len(d["removed"]) + len(d["renamed"]) + len(d["modified"]) for d in diff.values())
+
+def write_patch(diff: Dict[str, Any], new: Dict[str, List[Dict[str, Any]]], directory: str) -> Dict[str, int]:
+    """
+    Writes the added, renamed and modified entities of new into directory in
+    the export layout, so that `import.py --directory <patch>` applies them.
+    Trigger references are written as names, which the import resolves in
+    the target workspace. Removals cannot be expressed as an import and are
+    only listed in changes.json together with the full change set.
+    Returns the number of entities written per component type.
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    new_triggers = trigger_name_map(new)
+    counts = {}
+    for ctype in COMPONENT_FILES:
+        changed = set(diff[ctype]["added"]) | set(diff[ctype]["modified"]) | set(diff[ctype]["renamed"].values())
+        if ctype == "built_in_variables":
+            items = [clean_item(v) for v in new.get(ctype, []) if v.get("type") in changed]
+        else:
+            items = [portable_entity(ctype, item, new_triggers) for item in new.get(ctype, []) if item.get("name") in changed]
+        with open(os.path.join(directory, f"{ctype}.json"), 'w', encoding='utf-8') as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+        counts[ctype] = len(items)
+    with open(os.path.join(directory, CHANGES_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(diff, f, indent=2, ensure_ascii=False)
+    return counts
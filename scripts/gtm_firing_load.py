@@ -0,0 +1,190 @@
+from typing import Any, Dict, List, Optional
+
+from gtm_audit import chained_tag_names, load_container
+from gtm_trigger_engine import BUILT_IN_TRIGGERS, PAGE_LIFECYCLE, trigger_event
+
+# Default per-event budgets (tags fired, Custom HTML bytes)
+DEFAULT_BUDGET = {"tags": 10, "bytes": 20000}
+
+# Name of the aggregated row covering all page lifecycle events
+PAGE_LOAD = "page load"
+
+GROUPINGS = ["event", "trigger-type"]
+
+def html_bytes(tag: Dict[str, Any]) -> int:
+    """
+    Returns the size of the code a tag injects into the page (UTF-8 bytes of
+    the Custom HTML body). Template tags load libraries GTM manages and count as 0.
+    """
+    if tag.get("type") != "html":
+        return 0
+    for param in tag.get("parameter", []):
+        if param.get("key") == "html":
+            return len(param.get("value", "").encode("utf-8"))
+    return 0
+
+def is_conditional(trigger: Dict[str, Any]) -> bool:
+    """
+    True if a trigger only matches some occurrences of its event (it has
+    filters, or a custom event filter beyond a literal event name).
+    """
+    if trigger.get("filter") or trigger.get("autoEventFilter"):
+        return True
+    return trigger.get("type") == "customEvent" and trigger_event(trigger) is None
+
+class FiringLoad:
+    """
+    Static estimate of the tags and Custom HTML bytes fired per event. Tags are
+    joined to their firing and blocking triggers; setup and teardown tags are
+    counted with the tag that chains them. Each group reports an upper bound
+    (every trigger matches) and a lower bound (only unconditional triggers match).
+    """
+    def __init__(self, tags: List[Dict[str, Any]], triggers: List[Dict[str, Any]]):
+        self.tags = [t for t in tags if not t.get("paused")]
+        self.tag_by_name = {t.get("name"): t for t in self.tags}
+        self.triggers: Dict[str, Dict[str, Any]] = {}
+        for trigger_id, (name, event) in BUILT_IN_TRIGGERS.items():
+            trigger_type = {"gtm.js": "pageview", "gtm.init": "init", "gtm.init_consent": "consentInit"}[event]
+            self.triggers[trigger_id] = {"triggerId": trigger_id, "name": name, "type": trigger_type}
+        for trigger in triggers:
+            self.triggers[str(trigger.get("triggerId") or trigger.get("name"))] = trigger
+
+    @classmethod
+    def from_directory(cls, directory: str) -> "FiringLoad":
+        container = load_container(directory)
+        return cls(container["tags"], container["triggers"])
+
+    def trigger_group(self, trigger: Dict[str, Any], group_by: str) -> str:
+        if group_by == "trigger-type":
+            return trigger.get("type")
+        event = trigger_event(trigger)
+        if event is None:
+            # Custom events matched by pattern get their own group
+            return f"{trigger.get('type')}: {trigger.get('name')}"
+        return event
+
+    def _trigger(self, trigger_id: Any) -> Optional[Dict[str, Any]]:
+        return self.triggers.get(str(trigger_id))
+
+    def analyze(self, group_by: str = "event") -> Dict[str, Dict[str, Any]]:
+        """
+        Returns {group: {"triggers", "tags", "max_tags", "min_tags", "max_bytes", "min_bytes"}}.
+        Each tag entry is {"name", "type", "bytes", "conditional", "via"}.
+        """
+        if group_by not in GROUPINGS:
+            raise ValueError(f"Unknown grouping: {group_by} (expected one of {', '.join(GROUPINGS)})")
+
+        groups: Dict[str, Dict[str, Any]] = {}
+        for tag in self.tags:
+            # Firing triggers per group; the tag is unconditional in a group if
+            # any of its triggers there always matches.
+            firing: Dict[str, List[Dict[str, Any]]] = {}
+            for trigger_id in tag.get("firingTriggerId", []):
+                trigger = self._trigger(trigger_id)
+                if trigger is not None:
+                    firing.setdefault(self.trigger_group(trigger, group_by), []).append(trigger)
+
+            blocking: Dict[str, List[Dict[str, Any]]] = {}
+            for trigger_id in tag.get("blockingTriggerId", []):
+                trigger = self._trigger(trigger_id)
+                if trigger is not None:
+                    blocking.setdefault(self.trigger_group(trigger, group_by), []).append(trigger)
+
+            for key, triggers in firing.items():
+                blockers = blocking.get(key, [])
+                if any(not is_conditional(b) for b in blockers):
+                    # Always blocked on this event
+                    continue
+                conditional = bool(blockers) or all(is_conditional(t) for t in triggers)
+                group = groups.setdefault(key, {"triggers": [], "tags": []})
+                for trigger in triggers:
+                    if trigger.get("name") not in group["triggers"]:
+                        group["triggers"].append(trigger.get("name"))
+                self._add_with_chain(group, tag, conditional, ", ".join(t.get("name") for t in triggers))
+
+        for group in groups.values():
+            self._totals(group)
+        if group_by == "event":
+            lifecycle = [groups[e] for e in PAGE_LIFECYCLE if e in groups]
+            if lifecycle:
+                total = {"triggers": [], "tags": [t for g in lifecycle for t in g["tags"]]}
+                for g in lifecycle:
+                    total["triggers"].extend(g["triggers"])
+                groups[PAGE_LOAD] = self._totals(total)
+        return groups
+
+    def _add_with_chain(self, group: Dict[str, Any], tag: Dict[str, Any], conditional: bool, via: str):
+        """
+        Adds a tag and its setup/teardown chain to a group (each tag once per group).
+        """
+        present = {t["name"]: t for t in group["tags"]}
+        entries = []
+        for name in chained_tag_names(tag, "setupTag"):
+            entries.append((self.tag_by_name.get(name), f"setup of {tag.get('name')}"))
+        entries.append((tag, via))
+        for name in chained_tag_names(tag, "teardownTag"):
+            entries.append((self.tag_by_name.get(name), f"teardown of {tag.get('name')}"))
+
+        for chained, reason in entries:
+            if chained is None:
+                continue
+            name = chained.get("name")
+            if name in present:
+                # An unconditional path wins over a conditional one
+                present[name]["conditional"] = present[name]["conditional"] and conditional
+                continue
+            entry = {
+                "name": name,
+                "type": chained.get("type"),
+                "bytes": html_bytes(chained),
+                "conditional": conditional,
+                "via": reason,
+            }
+            group["tags"].append(entry)
+            present[name] = entry
+
+    @staticmethod
+    def _totals(group: Dict[str, Any]) -> Dict[str, Any]:
+        tags = group["tags"]
+        group["max_tags"] = len(tags)
+        group["min_tags"] = sum(1 for t in tags if not t["conditional"])
+        group["max_bytes"] = sum(t["bytes"] for t in tags)
+        group["min_bytes"] = sum(t["bytes"] for t in tags if not t["conditional"])
+        return group
+
+def check_budgets(groups: Dict[str, Dict[str, Any]], budgets: Optional[Dict[str, Dict[str, int]]] = None,
+                  default: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Compares the upper-bound estimate of every group against its budget
+    (budgets[group], falling back to budgets["*"] and then default).
+    Returns one finding per exceeded limit.
+    """
+    budgets = budgets or {}
+    default = {**DEFAULT_BUDGET, **(default or {}), **budgets.get("*", {})}
+    findings = []
+    for key, group in groups.items():
+        budget = {**default, **budgets.get(key, {})}
+        for metric, value in (("tags", group["max_tags"]), ("bytes", group["max_bytes"])):
+            limit = budget.get(metric)
+            if limit is not None and value > limit:
+                findings.append({
+                    "check": "firing_load",
+                    "type": "events",
+                    "names": [key],
+                    "metric": metric,
+                    "value": value,
+                    "limit": limit,
+                    "message": f"{key} fires up to {value} {'tags' if metric == 'tags' else 'Custom HTML bytes'} (budget {limit})",
+                })
+    return findings
+
+def sort_groups(groups: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Orders lifecycle events first (in firing order), then the page load total,
+    then the remaining groups by decreasing load.
+    """
+    lifecycle = [e for e in PAGE_LIFECYCLE if e in groups]
+    if PAGE_LOAD in groups:
+        lifecycle.append(PAGE_LOAD)
+    rest = sorted((k for k in groups if k not in lifecycle), key=lambda k: (-groups[k]["max_bytes"], -groups[k]["max_tags"], k))
+    return lifecycle + rest
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from gtm_audit import COMPONENT_FILES, hardcoded_ids, load_container, run_checks, script_code
+from gtm_index import find_container_dirs
+from entity_store import SQLITE_STORE_FILES
+
+DEFAULT_CACHE_PATH = os.path.join("tmp", "fleet_audit_cache.sqlite")
+# Part of every export fingerprint: bump it when checks or facts change so that cached results are recomputed
+AUDIT_VERSION = 1
+# An ID or script counts as shared once it appears in this many containers
+DEFAULT_MIN_CONTAINERS = 2
+
+def export_fingerprint(directory: str) -> str:
+    """
+    Content hash of the export files (JSON or SQLite store) of one container.
+    File times are ignored, so a nightly re-export that changed nothing keeps
+    its fingerprint.
+    """
+    digest = hashlib.sha256(f"audit-v{AUDIT_VERSION}".encode("utf-8"))
+    files = [(ctype, f"{ctype}.json") for ctype in COMPONENT_FILES] + [(name, name) for name in SQLITE_STORE_FILES]
+    for label, filename in files:
+        path = os.path.join(directory, filename)
+        digest.update(f"\0{label}\0".encode("utf-8"))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def script_hash(code: str) -> str:
+    """
+    Hash of a script with whitespace collapsed, so re-indented copies match.
+    """
+    return hashlib.sha1(" ".join(code.split()).encode("utf-8")).hexdigest()
+
+def container_facts(container: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    What the fleet aggregates need from one container: hard-coded measurement
+    IDs (with the tags using them) and the hash and size of every script.
+    """
+    measurement_ids: Dict[str, List[str]] = {}
+    for tag in container.get("tags", []):
+        for measurement_id in hardcoded_ids(tag):
+            measurement_ids.setdefault(measurement_id, []).append(tag.get("name"))
+    scripts = []
+    for ctype in ["tags", "variables"]:
+        for item in container.get(ctype, []):
+            code = script_code(ctype, item)
+            if code:
+                scripts.append({"type": ctype, "name": item.get("name"), "hash": script_hash(code), "bytes": len(code.encode("utf-8"))})
+    return {"measurement_ids": measurement_ids, "scripts": scripts}
+
+def audit_container(directory: str) -> Dict[str, Any]:
+    """
+    Map step, run in a worker process: all audit checks plus the facts for the aggregates.
+    """
+    container = load_container(directory)
+    return {
+        "directory": directory,
+        "counts": {ctype: len(items) for ctype, items in container.items()},
+        "findings": run_checks(container),
+        "facts": container_facts(container),
+    }
+
+class FleetAuditCache:
+    """
+    Per-container audit results keyed by directory and export fingerprint,
+    stored in a local SQLite database.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                directory TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                audited_at REAL NOT NULL,
+                result TEXT NOT NULL
+            )
+        """)
+
+    def get(self, directory: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT result FROM results WHERE directory = ? AND fingerprint = ?", (directory, fingerprint)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, directory: str, fingerprint: str, result: Dict[str, Any]):
+        self.conn.execute("INSERT OR REPLACE INTO results (directory, fingerprint, audited_at, result) VALUES (?, ?, ?, ?)",
+                          (directory, fingerprint, time.time(), json.dumps(result, ensure_ascii=False)))
+
+    def prune(self, root: str, keep: List[str]) -> int:
+        """
+        Drops the results of containers under root that no longer exist.
+        """
+        root = os.path.abspath(root)
+        root_prefix = os.path.join(root, "")
+        keep_set = set(keep)
+        stale = [(directory,) for (directory,) in self.conn.execute("SELECT directory FROM results")
+                 if (directory == root or directory.startswith(root_prefix)) and directory not in keep_set]
+        self.conn.executemany("DELETE FROM results WHERE directory = ?", stale)
+        return len(stale)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def aggregate(results: List[Dict[str, Any]], min_containers: int = DEFAULT_MIN_CONTAINERS) -> Dict[str, Any]:
+    """
+    Reduce step: merges per-container results into fleet-wide aggregates.
+    - findings_by_check: findings and affected containers per check
+    - measurement_ids: IDs hard-coded in at least min_containers containers
+    - copied_scripts: identical scripts (whitespace aside) in at least min_containers containers,
+      largest total footprint first
+    """
+    by_check: Dict[str, Dict[str, Any]] = {}
+    ids: Dict[str, Dict[str, Any]] = {}
+    scripts: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        directory = result["directory"]
+        for finding in result["findings"]:
+            entry = by_check.setdefault(finding["check"], {"findings": 0, "containers": set()})
+            entry["findings"] += 1
+            entry["containers"].add(directory)
+        for measurement_id, tags in result["facts"]["measurement_ids"].items():
+            entry = ids.setdefault(measurement_id, {"value": measurement_id, "containers": set(), "tags": 0})
+            entry["containers"].add(directory)
+            entry["tags"] += len(tags)
+        for script in result["facts"]["scripts"]:
+            entry = scripts.setdefault(script["hash"], {"hash": script["hash"], "type": script["type"], "bytes": script["bytes"], "containers": set(), "names": {}})
+            entry["containers"].add(directory)
+            entry["names"][script["name"]] = entry["names"].get(script["name"], 0) + 1
+
+    def finish(entry: Dict[str, Any]) -> Dict[str, Any]:
+        directories = sorted(entry.pop("containers"))
+        return dict(entry, containers=len(directories), directories=directories)
+
+    measurement_ids = [finish(e) for e in ids.values() if len(e["containers"]) >= min_containers]
+    measurement_ids.sort(key=lambda e: (-e["containers"], e["value"]))
+    copied = []
+    for entry in scripts.values():
+        if len(entry["containers"]) >= min_containers:
+            entry["names"] = sorted(entry["names"], key=lambda name: -entry["names"][name])
+            copied.append(finish(entry))
+    copied.sort(key=lambda e: -e["containers"] * e["bytes"])
+    return {
+        "findings_by_check": {check: {"findings": e["findings"], "containers": len(e["containers"])} for check, e in sorted(by_check.items())},
+        "measurement_ids": measurement_ids,
+        "copied_scripts": copied,
+    }
+
+def audit_fleet(root: str, workers: Optional[int] = None, cache: Optional[FleetAuditCache] = None,
+                min_containers: int = DEFAULT_MIN_CONTAINERS) -> Dict[str, Any]:
+    """
+    Audits every exported container under root. Containers whose export
+    fingerprint matches the cache are not re-audited; the others are sharded
+    across a process pool. Returns totals, per-container results (in
+    directory order) and the fleet aggregates.
+    """
+    directories = [os.path.abspath(d) for d in find_container_dirs(root)]
+    fingerprints = {d: export_fingerprint(d) for d in directories}
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for directory in directories:
+        cached = cache.get(directory, fingerprints[directory]) if cache else None
+        if cached is None:
+            pending.append(directory)
+        else:
+            results[directory] = cached
+
+    if workers == 1 or len(pending) <= 1:
+        fresh = map(audit_container, pending)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        shards = (workers or os.cpu_count() or 1) * 4
+        fresh = pool.map(audit_container, pending, chunksize=max(1, len(pending) // shards))
+    try:
+        for result in fresh:
+            directory = result["directory"]
+            results[directory] = result
+            if cache:
+                cache.put(directory, fingerprints[directory], result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if cache:
+            cache.prune(root, directories)
+            cache.commit()
+
+    ordered = [results[d] for d in directories]
+    return {
+        "totals": {
+            "containers": len(directories),
+            "audited": len(pending),
+            "cached": len(directories) - len(pending),
+            "findings": sum(len(r["findings"]) for r in ordered),
+        },
+        "containers": ordered,
+        "aggregates": aggregate(ordered, min_containers),
+    }
@@ -0,0 +1,310 @@
+import os
+import json
+import sqlite3
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from gtm_audit import COMPONENT_FILES, VARIABLE_REF_PATTERN, chained_tag_names, iter_parameters, iter_strings, load_container
+from gtm_utils import clean_item
+from entity_store import SQLITE_STORE_FILENAME, SQLITE_STORE_FILES
+
+DEFAULT_INDEX_PATH = os.path.join("tmp", "gtm_index.sqlite")
+
+ID_FIELDS = {"tags": "tagId", "triggers": "triggerId", "variables": "variableId"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    id INTEGER PRIMARY KEY,
+    directory TEXT UNIQUE NOT NULL,
+    public_id TEXT,
+    account_id TEXT,
+    container_id TEXT,
+    signature TEXT
+);
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    container_rowid INTEGER NOT NULL REFERENCES containers(id) ON DELETE CASCADE,
+    ctype TEXT NOT NULL,
+    entity_id TEXT,
+    name TEXT,
+    type TEXT,
+    fingerprint TEXT,
+    content_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entities_container ON entities(container_rowid, ctype, name);
+CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(name);
+CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(type);
+CREATE TABLE IF NOT EXISTS params (
+    entity_rowid INTEGER NOT NULL REFERENCES entities(id) ON DELETE CASCADE,
+    key TEXT,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_params_value ON params(value);
+CREATE INDEX IF NOT EXISTS idx_params_key ON params(key);
+CREATE INDEX IF NOT EXISTS idx_params_entity ON params(entity_rowid);
+CREATE TABLE IF NOT EXISTS refs (
+    entity_rowid INTEGER NOT NULL REFERENCES entities(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_refs_target ON refs(kind, target);
+CREATE INDEX IF NOT EXISTS idx_refs_entity ON refs(entity_rowid);
+"""
+
+def has_fts5(conn: sqlite3.Connection) -> bool:
+    """
+    Returns True if the SQLite library was built with FTS5.
+    """
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def find_container_dirs(root: str) -> List[str]:
+    """
+    Finds exported container directories (those holding tags/triggers/variables JSON
+    or an entities.sqlite store) under root.
+    Hidden directories such as the delta export's .base cache are skipped.
+    """
+    found = []
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        if any(f"{ctype}.json" in files for ctype in ID_FIELDS) or SQLITE_STORE_FILENAME in files:
+            found.append(current)
+    return found
+
+def directory_signature(directory: str) -> str:
+    """
+    Cheap change detector for a container directory based on file sizes and mtimes
+    (JSON files and the SQLite store, whose file is only touched by actual writes).
+    """
+    parts = []
+    for ctype in COMPONENT_FILES:
+        path = os.path.join(directory, f"{ctype}.json")
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{ctype}:{stat.st_size}:{stat.st_mtime_ns}")
+    for filename in SQLITE_STORE_FILES:
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+class FleetIndex:
+    """
+    Inverted index over many exported containers, stored in a local SQLite database.
+    Holds entity metadata, parameter key/value postings, reference edges and
+    (when available) an FTS5 full-text table over every string in each entity.
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("GTM_INDEX_PATH") or DEFAULT_INDEX_PATH
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.fts = has_fts5(self.conn)
+        if self.fts:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS entity_text USING fts5(body)")
+
+    def close(self):
+        self.conn.close()
+
+    def ingest(self, root: str, force: bool = False) -> Dict[str, int]:
+        """
+        Indexes every container directory under root. Unchanged directories are
+        skipped, and within a changed directory only entities whose content hash
+        changed are rewritten. Containers that disappeared from root are dropped.
+        """
+        stats = {"containers": 0, "skipped": 0, "entities_written": 0, "entities_deleted": 0, "removed": 0}
+        seen = set()
+        for directory in find_container_dirs(root):
+            directory = os.path.abspath(directory)
+            seen.add(directory)
+            written, deleted = self.ingest_container(directory, force=force)
+            if written is None:
+                stats["skipped"] += 1
+                continue
+            stats["containers"] += 1
+            stats["entities_written"] += written
+            stats["entities_deleted"] += deleted
+
+        root_prefix = os.path.join(os.path.abspath(root), "")
+        for rowid, directory in self.conn.execute("SELECT id, directory FROM containers").fetchall():
+            if (directory.startswith(root_prefix) or directory == os.path.abspath(root)) and directory not in seen:
+                self._delete_container(rowid)
+                stats["removed"] += 1
+        self.conn.commit()
+        return stats
+
+    def ingest_container(self, directory: str, force: bool = False) -> Tuple[Optional[int], int]:
+        """
+        Indexes one exported container inside the current transaction (the caller commits).
+        Returns (entities written, entities deleted), or (None, 0) if the directory
+        is unchanged since the last run.
+        """
+        signature = directory_signature(directory)
+        row = self.conn.execute("SELECT id, signature FROM containers WHERE directory = ?", (directory,)).fetchone()
+        if row and row[1] == signature and not force:
+            return None, 0
+
+        container = load_container(directory)
+        sample = next((item for ctype in ID_FIELDS for item in container[ctype]), {})
+        meta = (os.path.basename(directory), sample.get("accountId"), sample.get("containerId"), signature)
+        if row:
+            container_rowid = row[0]
+            self.conn.execute(
+                "UPDATE containers SET public_id = ?, account_id = ?, container_id = ?, signature = ? WHERE id = ?",
+                meta + (container_rowid,))
+        else:
+            container_rowid = self.conn.execute(
+                "INSERT INTO containers (public_id, account_id, container_id, signature, directory) VALUES (?, ?, ?, ?, ?)",
+                meta + (directory,)).lastrowid
+
+        existing = {
+            (ctype, name): (rowid, content_hash)
+            for rowid, ctype, name, content_hash in self.conn.execute(
+                "SELECT id, ctype, name, content_hash FROM entities WHERE container_rowid = ?", (container_rowid,))
+        }
+
+        written = 0
+        current = set()
+        for ctype in ID_FIELDS:
+            for item in container[ctype]:
+                key = (ctype, item.get("name"))
+                current.add(key)
+                content_hash = hashlib.sha1(json.dumps(item, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+                previous = existing.get(key)
+                if previous and previous[1] == content_hash:
+                    continue
+                if previous:
+                    self._delete_entities([previous[0]])
+                self._insert_entity(container_rowid, ctype, item, content_hash)
+                written += 1
+
+        stale = [rowid for key, (rowid, _) in existing.items() if key not in current]
+        self._delete_entities(stale)
+        return written, len(stale)
+
+    def _insert_entity(self, container_rowid: int, ctype: str, item: Dict[str, Any], content_hash: str):
+        rowid = self.conn.execute(
+            "INSERT INTO entities (container_rowid, ctype, entity_id, name, type, fingerprint, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (container_rowid, ctype, item.get(ID_FIELDS[ctype]), item.get("name"), item.get("type"), item.get("fingerprint"), content_hash)
+        ).lastrowid
+
+        self.conn.executemany(
+            "INSERT INTO params (entity_rowid, key, value) VALUES (?, ?, ?)",
+            [(rowid, key, value) for key, value in iter_parameters(item.get("parameter"))])
+
+        refs = set()
+        strings = list(iter_strings(clean_item(item)))
+        for value in strings:
+            refs.update(("variable", name) for name in VARIABLE_REF_PATTERN.findall(value))
+        if ctype == "tags":
+            for field in ("firingTriggerId", "blockingTriggerId"):
+                for trigger_id in item.get(field, []):
+                    # Stored as the raw ID (or name, for hand-written references) so that
+                    # renaming a trigger does not leave stale edges on unchanged tags
+                    refs.add(("trigger", str(trigger_id)))
+            for chain in ("setupTag", "teardownTag"):
+                refs.update(("tag", name) for name in chained_tag_names(item, chain))
+        self.conn.executemany(
+            "INSERT INTO refs (entity_rowid, kind, target) VALUES (?, ?, ?)",
+            [(rowid, kind, target) for kind, target in refs])
+
+        if self.fts:
+            self.conn.execute("INSERT INTO entity_text (rowid, body) VALUES (?, ?)", (rowid, "\n".join(strings)))
+
+    def _delete_entities(self, rowids: List[int]):
+        if not rowids:
+            return
+        rows = [(rowid,) for rowid in rowids]
+        self.conn.executemany("DELETE FROM params WHERE entity_rowid = ?", rows)
+        self.conn.executemany("DELETE FROM refs WHERE entity_rowid = ?", rows)
+        if self.fts:
+            self.conn.executemany("DELETE FROM entity_text WHERE rowid = ?", rows)
+        self.conn.executemany("DELETE FROM entities WHERE id = ?", rows)
+
+    def _delete_container(self, container_rowid: int):
+        rowids = [r[0] for r in self.conn.execute("SELECT id FROM entities WHERE container_rowid = ?", (container_rowid,))]
+        self._delete_entities(rowids)
+        self.conn.execute("DELETE FROM containers WHERE id = ?", (container_rowid,))
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        value: Optional[str] = None,
+        key: Optional[str] = None,
+        uses_variable: Optional[str] = None,
+        uses_trigger: Optional[str] = None,
+        ctype: Optional[str] = None,
+        entity_type: Optional[str] = None,
+        contains: bool = False,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns entities matching all given criteria.
+        text: full-text phrase over every string in the entity (e.g. 'document.cookie')
+        value/key: parameter postings (exact, or substring with contains=True)
+        uses_variable/uses_trigger: reference edges by name
+        ctype/entity_type: restrict to tags/triggers/variables and to a GTM type (e.g. 'jsm')
+        """
+        joins, where, args = [], [], []
+        select_param = "NULL, NULL"
+        if value is not None or key is not None:
+            joins.append("JOIN params p ON p.entity_rowid = e.id")
+            select_param = "p.key, p.value"
+            if value is not None:
+                where.append("p.value LIKE ?" if contains else "p.value = ?")
+                args.append(f"%{value}%" if contains else value)
+            if key is not None:
+                where.append("p.key = ?")
+                args.append(key)
+        if uses_variable is not None:
+            where.append("e.id IN (SELECT entity_rowid FROM refs WHERE kind = 'variable' AND target = ?)")
+            args.append(uses_variable)
+        if uses_trigger is not None:
+            where.append(
+                "e.id IN (SELECT r.entity_rowid FROM refs r JOIN entities t ON r.kind = 'trigger' "
+                "AND t.ctype = 'triggers' AND t.name = ? AND r.target IN (t.entity_id, t.name) "
+                "JOIN entities src ON src.id = r.entity_rowid AND src.container_rowid = t.container_rowid)")
+            args.append(uses_trigger)
+        if text is not None:
+            if self.fts:
+                phrase = '"' + text.replace('"', '""') + '"'
+                where.append("e.id IN (SELECT rowid FROM entity_text WHERE entity_text MATCH ?)")
+                args.append(phrase)
+            else:
+                where.append("e.id IN (SELECT entity_rowid FROM params WHERE value LIKE ?)")
+                args.append(f"%{text}%")
+        if ctype is not None:
+            where.append("e.ctype = ?")
+            args.append(ctype)
+        if entity_type is not None:
+            where.append("e.type = ?")
+            args.append(entity_type)
+
+        sql = (
+            f"SELECT DISTINCT c.public_id, c.directory, e.ctype, e.entity_id, e.name, e.type, {select_param} "
+            "FROM entities e JOIN containers c ON c.id = e.container_rowid "
+            + " ".join(joins)
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY c.public_id, e.ctype, e.name LIMIT ?"
+        )
+        args.append(limit)
+        columns = ["public_id", "directory", "ctype", "entity_id", "name", "type", "key", "value"]
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, args)]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "containers": self.conn.execute("SELECT COUNT(*) FROM containers").fetchone()[0],
+            "entities": self.conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0],
+            "params": self.conn.execute("SELECT COUNT(*) FROM params").fetchone()[0],
+            "refs": self.conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0],
+        }
@@ -0,0 +1,157 @@
+import io
+import sys
+import functools
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from gtm_audit import load_container
+from gtm_diff import DIFF_COMPONENTS, portable_entity, trigger_name_map
+from gtm_utils import clean_item, load_script, parse_gtm_workspace_url
+from entity_store import MemoryEntityStore
+
+DEFAULT_WORKERS = 4
+# GTM API default quota: 25 requests per 100 seconds per user. The bucket starts
+# full, so any 100 s window sees at most DEFAULT_BURST + 100 * DEFAULT_RATE requests.
+DEFAULT_RATE = 0.2
+DEFAULT_BURST = 5
+
+def load_change_set(directory: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Loads a change-set directory (export layout) in a target-independent form:
+    read-only fields are dropped and trigger IDs are replaced by trigger names,
+    so that every target resolves them against its own triggers.
+    """
+    container = load_container(directory)
+    trigger_names = trigger_name_map(container)
+    change_set = {ctype: [portable_entity(ctype, item, trigger_names) for item in container[ctype]] for ctype in DIFF_COMPONENTS}
+    change_set["built_in_variables"] = [clean_item(v) for v in container["built_in_variables"]]
+    return change_set
+
+def read_targets(path: str) -> List[str]:
+    """
+    Reads workspace URLs, one per line. Blank lines and # comments are ignored.
+    """
+    targets = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                targets.append(line)
+    return targets
+
+class ThreadOutput:
+    """
+    sys.stdout replacement that sends output of threads inside capture() to a
+    per-thread buffer and everything else to the original stream, so that the
+    import logs of concurrent targets do not interleave.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    @contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+@functools.lru_cache(maxsize=None)
+def import_module():
+    """
+    bin/import.py, loaded once (its name is a Python keyword).
+    """
+    return load_script("import")
+
+def target_status(summary: Dict[str, List[str]]) -> str:
+    if summary["errors"]:
+        return "failed"
+    if summary["created"] or summary["updated"]:
+        return "success"
+    return "skipped"
+
+def apply_to_target(client, url: str, change_set: Dict[str, List[Dict[str, Any]]], dry_run: bool = False,
+                    output: Optional[ThreadOutput] = None) -> Dict[str, Any]:
+    """
+    Imports the change set into one workspace through GTMDependencyResolver,
+    using an in-memory copy of the change set. Never raises; failures are
+    reported in the returned entry.
+    """
+    importer = import_module()
+    report: Dict[str, Any] = {"url": url, "status": "failed", "summary": None, "error": None}
+    start = time.perf_counter()
+    with (output.capture() if output else nullcontext()) as log:
+        try:
+            parsed = parse_gtm_workspace_url(url)
+            if not parsed:
+                raise ValueError(f"Could not parse GTM URL: {url}")
+            workspace_path = f"accounts/{parsed['account_id']}/containers/{parsed['container_id']}/workspaces/{parsed['workspace_id']}"
+            report["workspace"] = workspace_path
+            store = MemoryEntityStore(change_set)
+            resolver = importer.GTMDependencyResolver(client, workspace_path, "<change set>", dry_run=dry_run, store=store)
+            summary = importer.sync_workspace(resolver)
+            report["summary"] = summary
+            report["status"] = target_status(summary)
+        except Exception as e:
+            report["error"] = str(e)
+        report["seconds"] = round(time.perf_counter() - start, 2)
+        if log is not None:
+            report["log"] = log.getvalue()
+    return report
+
+def rollout(change_set: Dict[str, List[Dict[str, Any]]], targets: List[str], client_factory: Callable[[], Any],
+            workers: int = DEFAULT_WORKERS, dry_run: bool = False,
+            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Applies one change set to many workspaces on a bounded thread pool. Each
+    target gets its own client from client_factory (sharing a token and a rate
+    limiter is up to the factory). Results are returned in target order;
+    on_result is called as each target finishes.
+    """
+    import_module()
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(apply_to_target, client_factory(), url, change_set, dry_run, output): url for url in targets}
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if on_result:
+                    on_result(result)
+    finally:
+        sys.stdout = output.stream
+    return [results[url] for url in targets]
+
+def failed_targets(report: Dict[str, Any]) -> List[str]:
+    """
+    Returns the URLs of the failed targets of a previous rollout report.
+    """
+    return [entry["url"] for entry in report.get("targets", []) if entry.get("status") == "failed"]
+
+def merge_results(previous: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Replaces the entries of previous with the new results for the same URL and
+    appends the new targets, so a retry report still covers the whole fleet.
+    """
+    latest = {result["url"]: result for result in results}
+    merged = [latest.pop(entry["url"], entry) for entry in previous]
+    return merged + list(latest.values())
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    counts = {"success": 0, "skipped": 0, "failed": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return counts
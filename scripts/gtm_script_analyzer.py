@@ -0,0 +1,589 @@
+import re
+import zlib
+import functools
+import hashlib
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gtm_audit import VARIABLE_REF_PATTERN, iter_strings, load_container, script_code
+from gtm_firing_load import FiringLoad
+from gtm_trigger_engine import TriggerEngine
+from gtm_utils import clean_item
+
+# Estimated occurrences per page view of each event, used to weight findings
+# when no recorded corpus is given. Custom events fall back to CUSTOM_EVENT_FREQUENCY.
+EVENT_FREQUENCY = {
+    "gtm.init_consent": 1.0,
+    "gtm.init": 1.0,
+    "gtm.js": 1.0,
+    "gtm.dom": 1.0,
+    "gtm.load": 1.0,
+    "gtm.click": 3.0,
+    "gtm.linkClick": 1.0,
+    "gtm.formSubmit": 0.1,
+    "gtm.historyChange": 1.0,
+    "gtm.historyChange-v2": 1.0,
+    "gtm.pageError": 0.1,
+    "gtm.timer": 10.0,
+    "gtm.scrollDepth": 4.0,
+    "gtm.video": 2.0,
+    "gtm.elementVisibility": 2.0,
+}
+CUSTOM_EVENT_FREQUENCY = 0.5
+
+# Relative cost of each anti-pattern; score = severity * estimated frequency
+SEVERITY = {
+    "document_write": 5,
+    "sync_script": 4,
+    "scroll_handler": 3,
+    "repeated_dom_query": 2,
+    "heavy_variable": 2,
+}
+
+DOM_QUERY_METHODS = {"querySelector", "querySelectorAll", "getElementById", "getElementsByClassName", "getElementsByTagName", "getElementsByName"}
+HIGH_FREQUENCY_EVENTS = {"scroll", "resize", "mousemove", "touchmove", "wheel", "pointermove"}
+THROTTLE_NAMES = {"requestAnimationFrame", "setTimeout", "clearTimeout", "throttle", "debounce", "IntersectionObserver"}
+LOOP_KEYWORDS = {"for", "while", "do"}
+# Names the detectors look at, used to skip all other tokens quickly
+HANDLER_NAMES = {"addEventListener", "on", "bind"} | HIGH_FREQUENCY_EVENTS | {f"on{event}" for event in HIGH_FREQUENCY_EVENTS}
+QUERY_NAMES = DOM_QUERY_METHODS | {"$", "jQuery"}
+# Keywords after which a "/" starts a regular expression literal
+REGEX_PREFIX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else"}
+
+REPEATED_QUERY_THRESHOLD = 2
+HEAVY_VARIABLE_TOKENS = 400
+SHINGLE_SIZE = 5
+MIN_SIMILARITY_TOKENS = 20
+DEFAULT_SIMILARITY = 0.8
+
+# One-permutation MinHash: NUM_PERM bins split into BANDS bands for candidate generation
+NUM_PERM = 64
+BANDS = 16
+EMPTY_BIN = 1 << 64
+
+# Leading whitespace is consumed together with each token
+TOKEN_PATTERN = re.compile(r"""
+    ([\s\u00a0\ufeff]*)
+  (?:
+    (?P<comment>//[^\n]*|/\*[\s\S]*?\*/|<!--[^\n]*)
+  | (?P<gtmvar>\{\{[^{}]+\}\})
+  | (?P<template>`(?:[^`\\]|\\[\s\S])*`)
+  | (?P<str>"(?:[^"\\\n]|\\[\s\S])*"|'(?:[^'\\\n]|\\[\s\S])*')
+  | (?P<num>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_$\u0080-\uffff][\w$\u0080-\uffff]*)
+  | (?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|=>|&&|\|\||\?\?|\?\.|[-+*/%&|^<>!=]=|\+\+|--|<<|>>|\*\*|[{}()\[\];,.<>+\-*/%&|^!~?:=@\#])
+  | (?P<other>.)
+  )?
+""", re.VERBOSE)
+REGEX_PATTERN = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+SCRIPT_BLOCK_PATTERN = re.compile(r"<script\b([^>]*)>([\s\S]*?)</script\s*>", re.IGNORECASE)
+SRC_ATTR_PATTERN = re.compile(r"\bsrc\s*=", re.IGNORECASE)
+ASYNC_ATTR_PATTERN = re.compile(r"\b(?:async|defer)\b", re.IGNORECASE)
+TYPE_ATTR_PATTERN = re.compile(r"\btype\s*=\s*[\"']?([^\"'\s>]+)", re.IGNORECASE)
+JS_TYPES = {"text/javascript", "application/javascript", "module", "text/ecmascript"}
+
+# Adjacent tokens of these kinds need a space between them
+WORD_TOKENS = {"name", "num"}
+
+Token = Tuple[str, str, int]
+
+def tokenize(source: str, first_line: int = 1) -> List[Token]:
+    """
+    Splits JavaScript into (kind, value, line) tokens; whitespace and comments
+    are dropped. Kinds: name, num, str, template, regex, punct, gtmvar, other.
+    GTM {{Variable}} references are kept as single gtmvar tokens.
+    """
+    tokens: List[Token] = []
+    line = first_line
+    pos = 0
+    length = len(source)
+    match = TOKEN_PATTERN.match
+    while pos < length:
+        m = match(source, pos)
+        space = m.group(1)
+        if "\n" in space:
+            line += space.count("\n")
+        kind = m.lastgroup
+        if kind is None:
+            break
+        value = m.group(kind)
+        if kind == "punct" and value[0] == "/" and _regex_allowed(tokens):
+            regex = REGEX_PATTERN.match(source, m.start(kind))
+            if regex:
+                tokens.append(("regex", regex.group(), line))
+                pos = regex.end()
+                continue
+        if kind == "comment":
+            line += value.count("\n")
+        else:
+            tokens.append((kind, value, line))
+            if kind == "template":
+                line += value.count("\n")
+        pos = m.end()
+    return tokens
+
+def _regex_allowed(tokens: List[Token]) -> bool:
+    if not tokens:
+        return True
+    kind, value, _ = tokens[-1]
+    if kind == "punct":
+        return value not in (")", "]", "}")
+    return kind == "name" and value in REGEX_PREFIX_KEYWORDS
+
+def minify(tokens: List[Token]) -> str:
+    """
+    Joins tokens with the whitespace a minifier would keep. Used to estimate
+    the size of a script without comments and formatting. A line break between
+    two tokens is kept as one newline, since automatic semicolon insertion
+    depends on it.
+    """
+    parts = []
+    previous_kind, previous, previous_line = "", "", None
+    for kind, value, line in tokens:
+        if previous_line is not None and line > previous_line:
+            parts.append("\n")
+        elif (previous_kind in WORD_TOKENS and kind in WORD_TOKENS) or (previous in ("+", "-", "++", "--") and value[0] == previous[-1]):
+            parts.append(" ")
+        parts.append(value)
+        # Template literals may span lines; line is where a token starts
+        previous_kind, previous = kind, value
+        previous_line = line + value.count("\n") if kind == "template" else line
+    return "".join(parts)
+
+def split_html(html: str) -> Tuple[List[Tuple[str, str, int]], str]:
+    """
+    Splits a Custom HTML body into its <script> blocks, returned as
+    (attributes, code, first_line), and the remaining markup.
+    """
+    blocks = []
+    for m in SCRIPT_BLOCK_PATTERN.finditer(html):
+        blocks.append((m.group(1), m.group(2), html.count("\n", 0, m.start(2)) + 1))
+    return blocks, SCRIPT_BLOCK_PATTERN.sub("", html)
+
+def minify_markup(markup: str) -> str:
+    markup = re.sub(r"<!--[\s\S]*?-->", "", markup)
+    return re.sub(r">\s+<", "><", re.sub(r"\s+", " ", markup)).strip()
+
+# Detectors
+
+def _string_value(token: Token) -> Optional[str]:
+    if token[0] in ("str", "template"):
+        return token[1][1:-1]
+    return None
+
+def _call_arguments(tokens: List[Token], open_index: int) -> List[List[Token]]:
+    """
+    Returns the top-level arguments of the call whose "(" is at open_index.
+    """
+    args: List[List[Token]] = [[]]
+    depth = 0
+    for token in tokens[open_index:]:
+        value = token[1] if token[0] == "punct" else None
+        if value in ("(", "[", "{"):
+            depth += 1
+            if depth == 1:
+                continue
+        elif value in (")", "]", "}"):
+            depth -= 1
+            if depth == 0:
+                break
+        elif value == "," and depth == 1:
+            args.append([])
+            continue
+        args[-1].append(token)
+    return args if args != [[]] else []
+
+def _is_member(tokens: List[Token], index: int) -> bool:
+    return index > 0 and tokens[index - 1][1] in (".", "?.")
+
+def _next_is(tokens: List[Token], index: int, value: str) -> bool:
+    return index + 1 < len(tokens) and tokens[index + 1][1] == value
+
+def detect_document_write(tokens: List[Token]) -> Iterator[Tuple[int, str]]:
+    for i, (kind, value, line) in enumerate(tokens):
+        if value in ("write", "writeln") and kind == "name" and _is_member(tokens, i) and i >= 2 and tokens[i - 2][1] == "document":
+            yield line, f"document.{value}() blocks parsing and is ignored or rejected on async-loaded pages"
+
+def detect_sync_script(tokens: List[Token]) -> Iterator[Tuple[int, str]]:
+    for i, (kind, value, line) in enumerate(tokens):
+        if value not in ("async", "open") or kind != "name":
+            continue
+        # script.async = false / $.ajax({async: false})
+        if value == "async" and i + 2 < len(tokens) and tokens[i + 1][1] in ("=", ":") and tokens[i + 2][1] == "false":
+            yield line, "async set to false forces synchronous loading"
+        # xhr.open(method, url, false)
+        elif value == "open" and _is_member(tokens, i) and _next_is(tokens, i, "("):
+            args = _call_arguments(tokens, i + 1)
+            if len(args) >= 3 and [t[1] for t in args[2]] == ["false"]:
+                yield line, "synchronous XMLHttpRequest blocks the main thread"
+
+def detect_scroll_handlers(tokens: List[Token]) -> Iterator[Tuple[int, str]]:
+    if not THROTTLE_NAMES.isdisjoint(map(itemgetter(1), tokens)):
+        return
+    for i, (kind, value, line) in enumerate(tokens):
+        if value not in HANDLER_NAMES or kind != "name":
+            continue
+        event = None
+        if value in ("addEventListener", "on", "bind") and _is_member(tokens, i) and _next_is(tokens, i, "("):
+            args = _call_arguments(tokens, i + 1)
+            if args and len(args[0]) == 1:
+                event = _string_value(args[0][0])
+        elif value[2:] in HIGH_FREQUENCY_EVENTS and value.startswith("on") and _next_is(tokens, i, "="):
+            event = value[2:]
+        elif value in HIGH_FREQUENCY_EVENTS and _is_member(tokens, i) and _next_is(tokens, i, "("):
+            # jQuery shorthand: $(window).scroll(handler)
+            args = _call_arguments(tokens, i + 1)
+            event = value if args else None
+        if event in HIGH_FREQUENCY_EVENTS:
+            yield line, f"'{event}' handler without throttling (requestAnimationFrame, setTimeout or debounce)"
+
+def dom_queries(tokens: List[Token]) -> Iterator[Tuple[str, int]]:
+    """
+    Yields (query, line) for DOM lookups with a literal selector:
+    document.querySelector("x"), getElementById("x"), $("x"), jQuery("x").
+    """
+    for i, (kind, value, line) in enumerate(tokens):
+        if value not in QUERY_NAMES or kind != "name" or not _next_is(tokens, i, "("):
+            continue
+        if value in DOM_QUERY_METHODS and _is_member(tokens, i):
+            pass
+        elif value in ("$", "jQuery") and not _is_member(tokens, i):
+            pass
+        else:
+            continue
+        args = _call_arguments(tokens, i + 1)
+        if len(args) == 1 and len(args[0]) == 1:
+            selector = _string_value(args[0][0])
+            if selector is not None and not selector.lstrip().startswith("<"):
+                yield f"{value}({selector!r})", line
+
+def detect_repeated_queries(tokens: List[Token]) -> Iterator[Tuple[int, str]]:
+    seen: Dict[str, List[int]] = {}
+    for query, line in dom_queries(tokens):
+        seen.setdefault(query, []).append(line)
+    for query, lines in seen.items():
+        if len(lines) >= REPEATED_QUERY_THRESHOLD:
+            yield lines[0], f"{query} is evaluated {len(lines)} times; cache the result in a variable"
+
+def detect_heavy_variable(tokens: List[Token]) -> Iterator[Tuple[int, str]]:
+    reasons = []
+    loops = sum(1 for value in map(itemgetter(1), tokens) if value in LOOP_KEYWORDS)
+    queries = sum(1 for _ in dom_queries(tokens))
+    if loops:
+        reasons.append(f"{loops} loop(s)")
+    if queries:
+        reasons.append(f"{queries} DOM quer{'y' if queries == 1 else 'ies'}")
+    if len(tokens) > HEAVY_VARIABLE_TOKENS:
+        reasons.append(f"{len(tokens)} tokens")
+    if reasons:
+        yield (tokens[0][2] if tokens else 1), f"re-evaluated on every read: {', '.join(reasons)}"
+
+# Checks run per script kind: html tags and jsm variables
+CHECKS = {
+    "html": [("document_write", detect_document_write), ("sync_script", detect_sync_script),
+             ("scroll_handler", detect_scroll_handlers), ("repeated_dom_query", detect_repeated_queries)],
+    "jsm": [("document_write", detect_document_write), ("sync_script", detect_sync_script),
+            ("scroll_handler", detect_scroll_handlers), ("repeated_dom_query", detect_repeated_queries),
+            ("heavy_variable", detect_heavy_variable)],
+}
+
+def analyze_script(kind: str, source: str) -> Dict[str, Any]:
+    """
+    Tokenizes and checks one Custom HTML tag body ("html") or Custom JavaScript
+    variable body ("jsm"). Returns {"issues", "tokens", "minified", "raw_bytes", "minified_bytes"}.
+    """
+    issues = []
+    tokens: List[Token] = []
+    if kind == "html":
+        blocks, markup = split_html(source)
+        parts = [minify_markup(markup)]
+        for attributes, code, first_line in blocks:
+            script_type = TYPE_ATTR_PATTERN.search(attributes)
+            if script_type and script_type.group(1).lower() not in JS_TYPES:
+                parts.append(f"<script{attributes}>{code.strip()}</script>")
+                continue
+            if SRC_ATTR_PATTERN.search(attributes) and not ASYNC_ATTR_PATTERN.search(attributes):
+                issues.append(("sync_script", first_line, "<script src> without async/defer delays the tags queued after it"))
+            block_tokens = tokenize(code, first_line)
+            parts.append(f"<script{attributes.rstrip()}>{minify(block_tokens)}</script>")
+            tokens.extend(block_tokens)
+        minified = "".join(parts)
+    else:
+        tokens = tokenize(source)
+        minified = minify(tokens)
+
+    for check, detector in CHECKS[kind]:
+        for line, message in detector(tokens):
+            issues.append((check, line, message))
+    return {
+        "issues": issues,
+        "tokens": tokens,
+        "minified": minified,
+        "raw_bytes": len(source.encode("utf-8")),
+        "minified_bytes": len(minified.encode("utf-8")),
+    }
+
+# Similarity
+
+def shingles(tokens: List[Token]) -> set:
+    """
+    Hashes of overlapping SHINGLE_SIZE-token windows. String and number
+    literals are normalized so that copies differing only in IDs still match.
+    """
+    # crc32 keeps token hashes stable across worker processes (str hashes are salted)
+    ids = [_token_id(kind if kind in ("str", "num", "template") else value) for kind, value, _ in tokens]
+    if len(ids) < SHINGLE_SIZE:
+        return {hash(tuple(ids)) & 0xFFFFFFFFFFFFFFFF}
+    return {hash(window) & 0xFFFFFFFFFFFFFFFF for window in zip(*(ids[k:] for k in range(SHINGLE_SIZE)))}
+
+@functools.lru_cache(maxsize=65536)
+def _token_id(value: str) -> int:
+    return zlib.crc32(value.encode("utf-8"))
+
+def minhash(hashes: set) -> Tuple[int, ...]:
+    """
+    One-permutation MinHash: the smallest hash falling into each of NUM_PERM bins.
+    """
+    mins = [EMPTY_BIN] * NUM_PERM
+    for h in hashes:
+        slot = h % NUM_PERM
+        value = h // NUM_PERM
+        if value < mins[slot]:
+            mins[slot] = value
+    return tuple(mins)
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """
+    Estimated Jaccard similarity of two MinHash signatures (bins empty in both are ignored).
+    """
+    used = matches = 0
+    for x, y in zip(a, b):
+        if x != EMPTY_BIN or y != EMPTY_BIN:
+            used += 1
+            matches += x == y
+    return matches / used if used else 1.0
+
+def find_similar_scripts(scripts: List[Dict[str, Any]], threshold: float = DEFAULT_SIMILARITY) -> List[Dict[str, Any]]:
+    """
+    Groups identical (same minified body) and near-identical (MinHash similarity
+    >= threshold) scripts of the same kind. Candidate pairs come from LSH bands,
+    so the cost stays close to linear in the number of scripts.
+    """
+    exact: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for script in scripts:
+        exact.setdefault((script["kind"], script["digest"]), []).append(script)
+
+    groups = [members for members in exact.values()]
+    representatives = [members[0] for members in groups]
+    parent = list(range(len(groups)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = NUM_PERM // BANDS
+    buckets: Dict[Tuple, List[int]] = {}
+    for index, script in enumerate(representatives):
+        if script["signature"] is None:
+            continue
+        for band in range(BANDS):
+            key = (script["kind"], band, script["signature"][band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(index)
+
+    scores: Dict[int, float] = {}
+    for members in buckets.values():
+        for i in members[1:]:
+            a, b = find(members[0]), find(i)
+            if a == b:
+                continue
+            score = similarity(representatives[members[0]]["signature"], representatives[i]["signature"])
+            if score >= threshold:
+                parent[b] = a
+                scores[a] = min(scores.get(a, 1.0), score, scores.get(b, 1.0))
+
+    merged: Dict[int, List[Dict[str, Any]]] = {}
+    for index, members in enumerate(groups):
+        merged.setdefault(find(index), []).extend(members)
+
+    results = []
+    for root, members in merged.items():
+        if len(members) < 2:
+            continue
+        identical = len({m["digest"] for m in members}) == 1
+        results.append({
+            "check": "duplicate_script",
+            "type": "tags" if members[0]["kind"] == "html" else "variables",
+            "names": [m["name"] for m in members],
+            "containers": [m["container"] for m in members],
+            "similarity": 1.0 if identical else round(scores.get(root, threshold), 2),
+            "minified_bytes": members[0]["minified_bytes"],
+            "message": f"{len(members)} {'identical' if identical else 'near-identical'} "
+                       f"{'Custom HTML tags' if members[0]['kind'] == 'html' else 'Custom JavaScript variables'}",
+        })
+    results.sort(key=lambda r: -r["minified_bytes"] * (len(r["names"]) - 1))
+    return results
+
+# Firing frequency
+
+def static_frequencies(container: Dict[str, List[Dict[str, Any]]]) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Estimates how often each tag fires and each trigger is evaluated per page view
+    from the events its triggers listen to (EVENT_FREQUENCY). Setup and teardown
+    tags inherit the frequency of the tag chaining them.
+    """
+    load = FiringLoad(container["tags"], container["triggers"])
+    tag_frequency: Dict[str, float] = {}
+    for event, group in load.analyze("event").items():
+        if event == "page load":
+            continue
+        weight = EVENT_FREQUENCY.get(event, CUSTOM_EVENT_FREQUENCY)
+        for tag in group["tags"]:
+            tag_frequency[tag["name"]] = tag_frequency.get(tag["name"], 0.0) + weight
+    trigger_frequency = {}
+    for trigger_id, trigger in load.triggers.items():
+        group = load.trigger_group(trigger, "event")
+        trigger_frequency[trigger.get("name")] = EVENT_FREQUENCY.get(group, CUSTOM_EVENT_FREQUENCY)
+    return tag_frequency, trigger_frequency
+
+def replay_frequencies(directory: str, records: Iterable[Any]) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Same as static_frequencies, but counted by replaying a recorded corpus
+    (see gtm_trigger_engine) and normalized per page view.
+    """
+    container = load_container(directory)
+    engine = TriggerEngine(container["tags"], container["triggers"], container["variables"])
+    tag_counts: Dict[str, int] = {}
+    event_counts: Dict[str, int] = {}
+    events = 0
+    for result in engine.replay(records):
+        events += 1
+        event_counts[result["event"]] = event_counts.get(result["event"], 0) + 1
+        for name in result["tags"]:
+            tag_counts[name] = tag_counts.get(name, 0) + 1
+    pages = max(1, event_counts.get("gtm.js", 0))
+
+    load = FiringLoad(container["tags"], container["triggers"])
+    trigger_frequency = {}
+    for trigger in load.triggers.values():
+        group = load.trigger_group(trigger, "event")
+        # Pattern-matched custom event triggers are evaluated on every event
+        count = events if group.startswith("customEvent:") else event_counts.get(group, 0)
+        trigger_frequency[trigger.get("name")] = count / pages
+    return {name: count / pages for name, count in tag_counts.items()}, trigger_frequency
+
+def variable_frequencies(container: Dict[str, List[Dict[str, Any]]], tag_frequency: Dict[str, float],
+                         trigger_frequency: Dict[str, float]) -> Dict[str, float]:
+    """
+    A variable is read whenever a tag referencing it fires or a trigger
+    referencing it is evaluated, including through other variables.
+    """
+    readers: Dict[str, List[Tuple[str, str]]] = {}
+    for ctype in ("tags", "triggers", "variables"):
+        for item in container.get(ctype, []):
+            refs = set()
+            for value in iter_strings(clean_item(item)):
+                refs.update(VARIABLE_REF_PATTERN.findall(value))
+            for ref in refs:
+                readers.setdefault(ref, []).append((ctype, item.get("name")))
+
+    memo: Dict[str, float] = {}
+    def frequency(name: str, visiting: set) -> float:
+        if name in memo:
+            return memo[name]
+        total = 0.0
+        for ctype, reader in readers.get(name, []):
+            if ctype == "tags":
+                total += tag_frequency.get(reader, 0.0)
+            elif ctype == "triggers":
+                total += trigger_frequency.get(reader, 0.0)
+            elif reader not in visiting:
+                total += frequency(reader, visiting | {reader})
+        memo[name] = total
+        return total
+
+    return {v.get("name"): frequency(v.get("name"), {v.get("name")}) for v in container.get("variables", [])}
+
+# Containers and fleets
+
+def analyze_container(directory: str, tag_frequency: Optional[Dict[str, float]] = None,
+                      trigger_frequency: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Analyzes every Custom HTML tag and Custom JavaScript variable of one exported
+    container. Frequencies default to static estimates; pass replay counts to
+    rank by observed traffic. Returns findings (with frequency and score),
+    byte totals and per-script similarity signatures.
+    """
+    container = load_container(directory)
+    if tag_frequency is None or trigger_frequency is None:
+        static_tags, static_triggers = static_frequencies(container)
+        tag_frequency = static_tags if tag_frequency is None else tag_frequency
+        trigger_frequency = static_triggers if trigger_frequency is None else trigger_frequency
+    var_frequency = variable_frequencies(container, tag_frequency, trigger_frequency)
+
+    findings = []
+    scripts = []
+    totals = {"scripts": 0, "raw_bytes": 0, "minified_bytes": 0}
+    sources = [("html", "tags", tag, script_code("tags", tag), tag_frequency) for tag in container["tags"] if tag.get("type") == "html"]
+    sources += [("jsm", "variables", var, script_code("variables", var), var_frequency) for var in container["variables"] if var.get("type") == "jsm"]
+    for kind, ctype, item, source, frequencies in sources:
+        if not source:
+            continue
+        name = item.get("name")
+        result = analyze_script(kind, source)
+        frequency = round(frequencies.get(name, 0.0), 2)
+        totals["scripts"] += 1
+        totals["raw_bytes"] += result["raw_bytes"]
+        totals["minified_bytes"] += result["minified_bytes"]
+        for check, line, message in result["issues"]:
+            findings.append({
+                "check": check,
+                "type": ctype,
+                "names": [name],
+                "container": directory,
+                "line": line,
+                "frequency": frequency,
+                "score": round(SEVERITY[check] * frequency, 2),
+                "message": message,
+            })
+        tokens = result["tokens"]
+        scripts.append({
+            "kind": kind,
+            "name": name,
+            "container": directory,
+            "minified_bytes": result["minified_bytes"],
+            "digest": hashlib.sha1(result["minified"].encode("utf-8")).hexdigest(),
+            "signature": minhash(shingles(tokens)) if len(tokens) >= MIN_SIMILARITY_TOKENS else None,
+        })
+    return {"directory": directory, "totals": totals, "findings": findings, "scripts": scripts}
+
+def rank_findings(findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(findings, key=lambda f: (-f["score"], -SEVERITY[f["check"]], f["container"], f["names"][0]))
+
+def analyze_fleet(directories: List[str], workers: Optional[int] = None,
+                  threshold: float = DEFAULT_SIMILARITY) -> Dict[str, Any]:
+    """
+    Analyzes many containers in a process pool, then ranks all findings and
+    looks for identical or near-identical scripts across the whole fleet.
+    """
+    if workers == 1 or len(directories) <= 1:
+        results = [analyze_container(d) for d in directories]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_container, directories, chunksize=max(1, len(directories) // 64)))
+
+    totals = {"containers": len(results), "scripts": 0, "raw_bytes": 0, "minified_bytes": 0}
+    findings = []
+    scripts = []
+    for result in results:
+        for key in ("scripts", "raw_bytes", "minified_bytes"):
+            totals[key] += result["totals"][key]
+        findings.extend(result["findings"])
+        scripts.extend(result["scripts"])
+    return {
+        "totals": totals,
+        "findings": rank_findings(findings),
+        "duplicates": find_similar_scripts(scripts, threshold),
+    }
@@ -0,0 +1,558 @@
+import re
+import json
+import functools
+import urllib.parse
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gtm_audit import VARIABLE_REF_PATTERN, chained_tag_names, load_container
+
+# Event name each trigger type listens to (customEvent matches any event through its filter)
+TRIGGER_EVENTS = {
+    "consentInit": "gtm.init_consent",
+    "init": "gtm.init",
+    "pageview": "gtm.js",
+    "domReady": "gtm.dom",
+    "windowLoaded": "gtm.load",
+    "click": "gtm.click",
+    "linkClick": "gtm.linkClick",
+    "formSubmission": "gtm.formSubmit",
+    "historyChange": "gtm.historyChange",
+    "jsError": "gtm.pageError",
+    "timer": "gtm.timer",
+    "scrollDepth": "gtm.scrollDepth",
+    "youTubeVideo": "gtm.video",
+    "elementVisibility": "gtm.elementVisibility",
+}
+
+# Built-in triggers that do not appear in triggers.json
+BUILT_IN_TRIGGERS = {
+    "2147479553": ("All Pages", "gtm.js"),
+    "2147479572": ("Consent Initialization - All Pages", "gtm.init_consent"),
+    "2147479573": ("Initialization - All Pages", "gtm.init"),
+}
+
+# Events emitted for every page record, in firing order
+PAGE_LIFECYCLE = ["gtm.init_consent", "gtm.init", "gtm.js", "gtm.dom", "gtm.load"]
+
+# Built-in variables read from the data model of the current event
+BUILT_IN_DATA_LAYER_KEYS = {
+    "Click Element": "gtm.element",
+    "Click Classes": "gtm.elementClasses",
+    "Click ID": "gtm.elementId",
+    "Click Target": "gtm.elementTarget",
+    "Click URL": "gtm.elementUrl",
+    "Click Text": "gtm.elementText",
+    "Form Element": "gtm.element",
+    "Form Classes": "gtm.elementClasses",
+    "Form ID": "gtm.elementId",
+    "Form Target": "gtm.elementTarget",
+    "Form URL": "gtm.elementUrl",
+    "Form Text": "gtm.elementText",
+    "Error Message": "gtm.errorMessage",
+    "Error URL": "gtm.errorUrl",
+    "Error Line": "gtm.errorLine",
+    "New History Fragment": "gtm.newUrlFragment",
+    "Old History Fragment": "gtm.oldUrlFragment",
+    "New History State": "gtm.newHistoryState",
+    "Old History State": "gtm.oldHistoryState",
+    "History Source": "gtm.historyChangeSource",
+    "Scroll Depth Threshold": "gtm.scrollThreshold",
+    "Scroll Depth Units": "gtm.scrollUnits",
+    "Scroll Direction": "gtm.scrollDirection",
+    "Video Provider": "gtm.videoProvider",
+    "Video Status": "gtm.videoStatus",
+    "Video URL": "gtm.videoUrl",
+    "Video Title": "gtm.videoTitle",
+    "Video Duration": "gtm.videoDuration",
+    "Video Current Time": "gtm.videoCurrentTime",
+    "Video Percent": "gtm.videoPercent",
+    "Percent Visible": "gtm.visibleRatio",
+    "On-Screen Duration": "gtm.visibleTime",
+}
+
+# Auto-event variable (aev) types and the data model key they read
+AUTO_EVENT_KEYS = {
+    "ELEMENT": "gtm.element",
+    "CLASSES": "gtm.elementClasses",
+    "ID": "gtm.elementId",
+    "TARGET": "gtm.elementTarget",
+    "URL": "gtm.elementUrl",
+    "TEXT": "gtm.elementText",
+    "HISTORY_NEW_URL_FRAGMENT": "gtm.newUrlFragment",
+    "HISTORY_OLD_URL_FRAGMENT": "gtm.oldUrlFragment",
+    "HISTORY_NEW_STATE": "gtm.newHistoryState",
+    "HISTORY_OLD_STATE": "gtm.oldHistoryState",
+    "HISTORY_CHANGE_SOURCE": "gtm.historyChangeSource",
+}
+
+UNDEFINED = None
+
+@functools.lru_cache(maxsize=4096)
+def compile_regex(pattern: str, ignore_case: bool) -> "re.Pattern":
+    """
+    Compiles (and caches) a trigger regex. Invalid patterns never match.
+    """
+    try:
+        return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    except re.error:
+        return re.compile(r"(?!)")
+
+def to_text(value: Any) -> str:
+    """
+    String conversion used by GTM string operators (undefined -> "undefined").
+    """
+    if value is None:
+        return "undefined"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return str(value)
+
+def to_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def deep_merge(model: Dict[str, Any], push: Dict[str, Any]):
+    """
+    Merges a dataLayer push into the data model the way GTM does for objects.
+    """
+    for key, value in push.items():
+        if isinstance(value, dict) and isinstance(model.get(key), dict):
+            deep_merge(model[key], value)
+        else:
+            model[key] = value
+
+def get_path(model: Dict[str, Any], dotted: str, flat: bool = False) -> Any:
+    """
+    Reads a (dotted) data layer key. Version 1 data layer variables use flat keys.
+    """
+    if flat or dotted in model:
+        return model.get(dotted)
+    value: Any = model
+    for part in dotted.split("."):
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return UNDEFINED
+    return value
+
+def params_dict(parameters: Optional[List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    return {p.get("key"): p for p in parameters or [] if p.get("key")}
+
+class EventContext:
+    """
+    State visible while evaluating one event: page, data model and lazily
+    resolved variable values (memoized per event).
+    """
+    __slots__ = ("page_url", "page", "referrer", "model", "event", "cookies", "globals", "memo")
+
+    def __init__(self, page_url: str, referrer: str, model: Dict[str, Any], event: str, cookies: Dict[str, str], js_globals: Dict[str, Any]):
+        self.page_url = page_url
+        self.page = urllib.parse.urlsplit(page_url)
+        self.referrer = referrer
+        self.model = model
+        self.event = event
+        self.cookies = cookies
+        self.globals = js_globals
+        self.memo: Dict[str, Any] = {}
+
+class TriggerEngine:
+    """
+    Compiles the triggers of one exported container into predicates and evaluates
+    them against recorded events, reporting which triggers match and which tags fire.
+    """
+    def __init__(self, tags: List[Dict[str, Any]], triggers: List[Dict[str, Any]], variables: List[Dict[str, Any]]):
+        self.tags = [t for t in tags if not t.get("paused")]
+        self.variables = {v.get("name"): v for v in variables}
+        self.unsupported: Dict[str, int] = {}
+        self._resolving: set = set()
+
+        # Predicates per trigger ID, indexed by the event they listen to.
+        # customEvent triggers whose filter is a plain "{{_event}} equals X"
+        # are indexed under X; the others are checked on every event.
+        self.trigger_names: Dict[str, str] = {}
+        self.by_event: Dict[str, List[Tuple[str, Callable[[EventContext], bool]]]] = {}
+        self.any_event: List[Tuple[str, Callable[[EventContext], bool]]] = []
+        for trigger_id, (name, event) in BUILT_IN_TRIGGERS.items():
+            self.trigger_names[trigger_id] = name
+            self.by_event.setdefault(event, []).append((trigger_id, lambda ctx: True))
+        for trigger in triggers:
+            self._add_trigger(trigger)
+
+        self.tag_by_name = {t.get("name"): t for t in self.tags}
+        self.firing: Dict[str, List[Dict[str, Any]]] = {}
+        for tag in self.tags:
+            for trigger_id in tag.get("firingTriggerId", []):
+                self.firing.setdefault(str(trigger_id), []).append(tag)
+
+    @classmethod
+    def from_directory(cls, directory: str) -> "TriggerEngine":
+        container = load_container(directory)
+        return cls(container["tags"], container["triggers"], container["variables"])
+
+    # Compilation
+
+    def _add_trigger(self, trigger: Dict[str, Any]):
+        trigger_id = str(trigger.get("triggerId") or trigger.get("name"))
+        self.trigger_names[trigger_id] = trigger.get("name")
+        trigger_type = trigger.get("type")
+
+        conditions = []
+        for field in ("customEventFilter", "filter", "autoEventFilter"):
+            conditions.extend(self.compile_condition(c) for c in trigger.get(field, []))
+        predicate = self._all(conditions)
+
+        event = trigger_event(trigger)
+        if trigger_type == "customEvent":
+            if event is not None:
+                self.by_event.setdefault(event, []).append((trigger_id, predicate))
+            else:
+                self.any_event.append((trigger_id, predicate))
+            return
+
+        if event is None:
+            self.unsupported[f"trigger type {trigger_type}"] = self.unsupported.get(f"trigger type {trigger_type}", 0) + 1
+            return
+        self.by_event.setdefault(event, []).append((trigger_id, predicate))
+        if trigger_type == "historyChange":
+            self.by_event.setdefault("gtm.historyChange-v2", []).append((trigger_id, predicate))
+
+    @staticmethod
+    def _all(conditions: List[Callable[[EventContext], bool]]) -> Callable[[EventContext], bool]:
+        if not conditions:
+            return lambda ctx: True
+        if len(conditions) == 1:
+            return conditions[0]
+        return lambda ctx: all(condition(ctx) for condition in conditions)
+
+    @staticmethod
+    def _literal_event(conditions: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Returns X if the custom event filter is exactly "{{_event}} equals X".
+        """
+        if len(conditions) != 1 or conditions[0].get("type") != "equals":
+            return None
+        params = params_dict(conditions[0].get("parameter"))
+        if params.get("arg0", {}).get("value") != "{{_event}}":
+            return None
+        if any(params.get(flag, {}).get("value") == "true" for flag in ("negate", "ignore_case")):
+            return None
+        value = params.get("arg1", {}).get("value")
+        if value is None or VARIABLE_REF_PATTERN.search(value):
+            return None
+        return value
+
+    def compile_condition(self, condition: Dict[str, Any]) -> Callable[[EventContext], bool]:
+        """
+        Compiles one GTM condition ({type, parameter: [arg0, arg1, negate, ignore_case]})
+        into a predicate over an EventContext.
+        """
+        params = params_dict(condition.get("parameter"))
+        operator = condition.get("type")
+        left = self.compile_template(params.get("arg0", {}).get("value", ""))
+        right_template = params.get("arg1", {}).get("value", "")
+        right = self.compile_template(right_template)
+        negate = params.get("negate", {}).get("value") == "true"
+        ignore_case = params.get("ignore_case", {}).get("value") == "true"
+        fold = str.lower if ignore_case else (lambda s: s)
+
+        if operator in ("equals", "contains", "startsWith", "endsWith"):
+            test = {
+                "equals": lambda a, b: a == b,
+                "contains": lambda a, b: b in a,
+                "startsWith": lambda a, b: a.startswith(b),
+                "endsWith": lambda a, b: a.endswith(b),
+            }[operator]
+            predicate = lambda ctx: test(fold(to_text(left(ctx))), fold(to_text(right(ctx))))
+        elif operator == "matchRegex":
+            if VARIABLE_REF_PATTERN.search(right_template):
+                predicate = lambda ctx: compile_regex(to_text(right(ctx)), ignore_case).search(to_text(left(ctx))) is not None
+            else:
+                regex = compile_regex(right_template, ignore_case)
+                predicate = lambda ctx: regex.search(to_text(left(ctx))) is not None
+        elif operator in ("greater", "greaterOrEquals", "less", "lessOrEquals"):
+            compare = {
+                "greater": lambda a, b: a > b,
+                "greaterOrEquals": lambda a, b: a >= b,
+                "less": lambda a, b: a < b,
+                "lessOrEquals": lambda a, b: a <= b,
+            }[operator]
+            def predicate(ctx, compare=compare):
+                a, b = to_number(left(ctx)), to_number(right(ctx))
+                return a is not None and b is not None and compare(a, b)
+        elif operator == "cssSelector":
+            # The DOM is not available offline; recorded events may list the selectors the element matched
+            predicate = lambda ctx: to_text(right(ctx)) in (ctx.model.get("gtm.elementMatches") or [])
+        else:
+            key = f"condition {operator}"
+            self.unsupported[key] = self.unsupported.get(key, 0) + 1
+            predicate = lambda ctx: False
+
+        if negate:
+            return lambda ctx: not predicate(ctx)
+        return predicate
+
+    def compile_template(self, template: str) -> Callable[[EventContext], Any]:
+        """
+        Compiles a parameter value: a single {{Variable}} keeps the variable's raw
+        value, mixed text is rendered as a string, plain text is a constant.
+        """
+        refs = VARIABLE_REF_PATTERN.findall(template)
+        if not refs:
+            return lambda ctx: template
+        if template == "{{" + refs[0] + "}}":
+            name = refs[0]
+            return lambda ctx: self.resolve(name, ctx)
+        return lambda ctx: VARIABLE_REF_PATTERN.sub(lambda m: to_text(self.resolve(m.group(1), ctx)), template)
+
+    # Variable resolution
+
+    def resolve(self, name: str, ctx: EventContext) -> Any:
+        """
+        Resolves a built-in or user-defined variable for the current event.
+        """
+        if name in ctx.memo:
+            return ctx.memo[name]
+        if name in self._resolving:
+            return UNDEFINED
+        self._resolving.add(name)
+        try:
+            value = self._resolve(name, ctx)
+        finally:
+            self._resolving.discard(name)
+        ctx.memo[name] = value
+        return value
+
+    def _resolve(self, name: str, ctx: EventContext) -> Any:
+        if name in ("_event", "Event"):
+            return ctx.event
+        if name == "Page URL":
+            return urllib.parse.urlunsplit(ctx.page._replace(fragment=""))
+        if name == "Page Hostname":
+            return ctx.page.hostname or ""
+        if name == "Page Path":
+            return ctx.page.path or "/"
+        if name == "Referrer":
+            return ctx.referrer
+        if name in BUILT_IN_DATA_LAYER_KEYS:
+            return ctx.model.get(BUILT_IN_DATA_LAYER_KEYS[name])
+
+        variable = self.variables.get(name)
+        if variable is None:
+            self.unsupported[f"variable {name}"] = self.unsupported.get(f"variable {name}", 0) + 1
+            return UNDEFINED
+        params = params_dict(variable.get("parameter"))
+        value_of = lambda key, default=None: params.get(key, {}).get("value", default)
+        vtype = variable.get("type")
+
+        if vtype == "v":
+            value = get_path(ctx.model, value_of("name", ""), flat=value_of("dataLayerVersion") == "1")
+            if value is UNDEFINED and value_of("setDefaultValue") == "true":
+                value = self.compile_template(value_of("defaultValue", ""))(ctx)
+            return value
+        if vtype == "c":
+            return self.compile_template(value_of("value", ""))(ctx)
+        if vtype == "e":
+            return ctx.event
+        if vtype == "k":
+            return ctx.cookies.get(value_of("name", ""))
+        if vtype == "j":
+            return get_path(ctx.globals, value_of("name", ""))
+        if vtype == "aev":
+            return ctx.model.get(AUTO_EVENT_KEYS.get(value_of("varType", ""), ""))
+        if vtype == "u":
+            return self._url_component(params, ctx)
+        if vtype in ("smm", "remm"):
+            return self._lookup(vtype, params, ctx)
+
+        self.unsupported[f"variable type {vtype}"] = self.unsupported.get(f"variable type {vtype}", 0) + 1
+        return UNDEFINED
+
+    def _url_component(self, params: Dict[str, Dict[str, Any]], ctx: EventContext) -> Any:
+        source = params.get("customUrlSource", {}).get("value")
+        url = self.compile_template(source)(ctx) if source else ctx.page_url
+        parts = urllib.parse.urlsplit(to_text(url))
+        component = params.get("component", {}).get("value", "URL")
+        if component == "PROTOCOL":
+            return parts.scheme
+        if component == "HOST":
+            host = parts.hostname or ""
+            if params.get("stripWww", {}).get("value") == "true" and host.startswith("www."):
+                host = host[4:]
+            return host
+        if component == "PORT":
+            return parts.port or (443 if parts.scheme == "https" else 80)
+        if component == "PATH":
+            return parts.path
+        if component == "FRAGMENT":
+            return parts.fragment
+        if component == "QUERY":
+            query_key = params.get("queryKey", {}).get("value")
+            if not query_key:
+                return parts.query
+            values = urllib.parse.parse_qs(parts.query, keep_blank_values=True).get(query_key)
+            return values[0] if values else UNDEFINED
+        return urllib.parse.urlunsplit(parts)
+
+    def _lookup(self, vtype: str, params: Dict[str, Dict[str, Any]], ctx: EventContext) -> Any:
+        value = to_text(self.compile_template(params.get("input", {}).get("value", ""))(ctx))
+        ignore_case = params.get("ignoreCase", {}).get("value") == "true"
+        full_match = params.get("fullMatch", {}).get("value") == "true"
+        for row in params.get("map", {}).get("list", []):
+            entry = params_dict(row.get("map"))
+            key = entry.get("key", {}).get("value", "")
+            if vtype == "smm":
+                matched = key == value
+            else:
+                regex = compile_regex(f"^(?:{key})$" if full_match else key, ignore_case)
+                matched = regex.search(value) is not None
+            if matched:
+                return self.compile_template(entry.get("value", {}).get("value", ""))(ctx)
+        if params.get("setDefaultValue", {}).get("value") == "true":
+            return self.compile_template(params.get("defaultValue", {}).get("value", ""))(ctx)
+        return UNDEFINED
+
+    # Evaluation
+
+    def matching_triggers(self, ctx: EventContext) -> List[str]:
+        """
+        Returns the IDs of the triggers that match the current event.
+        """
+        matched = []
+        for trigger_id, predicate in self.by_event.get(ctx.event, []):
+            if predicate(ctx):
+                matched.append(trigger_id)
+        for trigger_id, predicate in self.any_event:
+            if predicate(ctx):
+                matched.append(trigger_id)
+        return matched
+
+    def firing_tags(self, matched: List[str], fired_on_page: Optional[set] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the tags fired by the matched triggers (minus blocked tags),
+        including setup and teardown tags in firing order.
+        """
+        matched_set = set(matched)
+        candidates = []
+        seen = set()
+        for trigger_id in matched:
+            for tag in self.firing.get(trigger_id, []):
+                if id(tag) in seen:
+                    continue
+                seen.add(id(tag))
+                if any(str(b) in matched_set for b in tag.get("blockingTriggerId", [])):
+                    continue
+                if fired_on_page is not None and tag.get("tagFiringOption") == "oncePerLoad":
+                    if tag.get("name") in fired_on_page:
+                        continue
+                    fired_on_page.add(tag.get("name"))
+                candidates.append(tag)
+
+        ordered = []
+        emitted = set()
+        def emit(tag):
+            if tag is not None and tag.get("name") not in emitted:
+                emitted.add(tag.get("name"))
+                ordered.append(tag)
+        for tag in candidates:
+            for name in chained_tag_names(tag, "setupTag"):
+                emit(self.tag_by_name.get(name))
+            emit(tag)
+            for name in chained_tag_names(tag, "teardownTag"):
+                emit(self.tag_by_name.get(name))
+        return ordered
+
+    def replay(self, records: Iterable[Any], auto_lifecycle: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Streams recorded records and yields one result per evaluated event.
+        A record is either a page URL string, a page record
+        {"page": url, "referrer": ..., "cookies": {...}, "globals": {...}}
+        (which starts a new page and, with auto_lifecycle, emits gtm.init_consent,
+        gtm.init, gtm.js, gtm.dom and gtm.load), or a dataLayer push. Pushes
+        without an "event" key only update the data model.
+        """
+        page_url, referrer, cookies, js_globals = "", "", {}, {}
+        model: Dict[str, Any] = {}
+        fired_on_page: set = set()
+        index = 0
+
+        def evaluate(event: str):
+            ctx = EventContext(page_url, referrer, model, event, cookies, js_globals)
+            matched = self.matching_triggers(ctx)
+            tags = self.firing_tags(matched, fired_on_page)
+            return {
+                "index": index,
+                "page": page_url,
+                "event": event,
+                "triggers": [self.trigger_names.get(t, t) for t in matched],
+                "tags": [t.get("name") for t in tags],
+            }
+
+        for record in records:
+            if isinstance(record, str):
+                record = {"page": record}
+            if not isinstance(record, dict):
+                continue
+            if "page" in record and "event" not in record:
+                page_url = record["page"]
+                referrer = record.get("referrer", "")
+                cookies = record.get("cookies", {})
+                js_globals = record.get("globals", {})
+                model = {}
+                fired_on_page = set()
+                if auto_lifecycle:
+                    for event in PAGE_LIFECYCLE:
+                        model["event"] = event
+                        yield evaluate(event)
+                        index += 1
+                continue
+
+            deep_merge(model, record)
+            event = record.get("event")
+            if event:
+                yield evaluate(event)
+                index += 1
+
+def trigger_event(trigger: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the event name a trigger listens to, or None when it cannot be known
+    statically (custom event filters other than "{{_event}} equals X", unknown types).
+    """
+    trigger_type = trigger.get("type")
+    if trigger_type == "customEvent":
+        return TriggerEngine._literal_event(trigger.get("customEventFilter", []))
+    if trigger_type == "timer":
+        return params_dict(trigger.get("parameter")).get("eventName", {}).get("value") or TRIGGER_EVENTS["timer"]
+    return TRIGGER_EVENTS.get(trigger_type)
+
+def read_records(stream: Iterable[str], strict: bool = False, skipped: Optional[List[int]] = None) -> Iterator[Any]:
+    """
+    Parses a JSON Lines corpus. Lines that are not JSON are treated as page URLs.
+    Lines that look like JSON but do not decode (e.g. truncated by a crashed
+    recorder) are skipped and their line numbers appended to skipped, unless
+    strict is set, in which case the first one raises ValueError.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] in "{[\"":
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                if strict:
+                    raise ValueError(f"Line {line_number} is not valid JSON: {e}") from e
+                if skipped is not None:
+                    skipped.append(line_number)
+                continue
+            if isinstance(record, list):
+                yield from record
+            else:
+                yield record
+        else:
+            yield line
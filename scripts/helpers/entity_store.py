@@ -0,0 +1,365 @@
+import os
+import sys
+import copy
+import json
+import sqlite3
+import hashlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from gtm_utils import clean_item
+
+STORE_BACKENDS = ["json", "sqlite"]
+SQLITE_STORE_FILENAME = "entities.sqlite"
+# The database and its write-ahead log, which holds commits not yet checkpointed
+SQLITE_STORE_FILES = [SQLITE_STORE_FILENAME, f"{SQLITE_STORE_FILENAME}-wal"]
+ID_FIELDS = {"tags": "tagId", "triggers": "triggerId", "variables": "variableId"}
+
+def entity_key(item: Dict[str, Any]) -> str:
+    """
+    Returns the key an entity is stored under: its name (built-in variables fall back to type).
+    """
+    return item.get("name") or item.get("type")
+
+def content_hash(item: Dict[str, Any]) -> str:
+    """
+    Hash of the user-editable content of an entity. Read-only metadata such as
+    fingerprint or path is excluded, so writing back sync metadata keeps the hash.
+    """
+    payload = json.dumps(clean_item(item), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class EntityStore(ABC):
+    """
+    Storage backend for the local copy of a workspace (tags, triggers, variables
+    and built-in variables). Component types are the export file names without
+    the .json extension.
+    """
+    @abstractmethod
+    def load(self, ctype: str) -> List[Dict[str, Any]]:
+        """
+        Returns all entities of a component type in their stored order.
+        """
+
+    @abstractmethod
+    def get(self, ctype: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a single entity by name, or None.
+        """
+
+    @abstractmethod
+    def get_by_id(self, ctype: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a single entity by its GTM ID (tagId, triggerId, variableId), or None.
+        """
+
+    @abstractmethod
+    def names(self, ctype: str) -> List[str]:
+        """
+        Returns the names of all entities of a component type in their stored order.
+        """
+
+    @abstractmethod
+    def hashes(self, ctype: str) -> Dict[str, str]:
+        """
+        Returns {name: content_hash} for a component type, in stored order.
+        """
+
+    @abstractmethod
+    def put(self, ctype: str, item: Dict[str, Any]):
+        """
+        Inserts or updates a single entity (matched by name).
+        """
+
+    @abstractmethod
+    def delete(self, ctype: str, name: str):
+        """
+        Removes a single entity by name.
+        """
+
+    @abstractmethod
+    def replace_all(self, ctype: str, items: List[Dict[str, Any]]) -> int:
+        """
+        Makes the stored entities of a component type equal to items, keeping
+        their order. Returns the number of entities actually written.
+        """
+
+    @abstractmethod
+    def batch(self) -> ContextManager["EntityStore"]:
+        """
+        Groups writes so that they are committed atomically when the block exits.
+        """
+
+    @abstractmethod
+    def describe(self, ctype: str) -> str:
+        """
+        Human-readable location of a component type, for log messages.
+        """
+
+    def close(self):
+        pass
+
+class JSONEntityStore(EntityStore):
+    """
+    The original layout: one pretty-printed JSON file per component type.
+    Single-entity writes rewrite the whole file, so they are deferred until
+    the enclosing batch exits.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._cache: Dict[str, List[Dict[str, Any]]] = {}
+        # Entities by name, built on first lookup and kept in step with writes
+        self._index: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Entities by ID, built on first lookup and dropped on any write to the type
+        self._id_index: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._dirty = set()
+        self._batch_depth = 0
+
+    def _path(self, ctype: str) -> str:
+        return os.path.join(self.directory, f"{ctype}.json")
+
+    def describe(self, ctype: str) -> str:
+        return self._path(ctype)
+
+    def load(self, ctype: str) -> List[Dict[str, Any]]:
+        if ctype not in self._cache:
+            path = self._path(ctype)
+            if not os.path.exists(path):
+                print(f"Warning: {path} not found. Skipping...")
+                self._cache[ctype] = []
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._cache[ctype] = json.load(f)
+        return self._cache[ctype]
+
+    def _by_name(self, ctype: str) -> Dict[str, Dict[str, Any]]:
+        if ctype not in self._index:
+            self._index[ctype] = {entity_key(item): item for item in self.load(ctype)}
+        return self._index[ctype]
+
+    def get(self, ctype: str, name: str) -> Optional[Dict[str, Any]]:
+        return self._by_name(ctype).get(name)
+
+    def get_by_id(self, ctype: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        if ctype not in self._id_index:
+            id_field = ID_FIELDS.get(ctype, "")
+            self._id_index[ctype] = {str(item[id_field]): item for item in self.load(ctype) if item.get(id_field) is not None}
+        return self._id_index[ctype].get(str(entity_id))
+
+    def names(self, ctype: str) -> List[str]:
+        return list(self._by_name(ctype))
+
+    def hashes(self, ctype: str) -> Dict[str, str]:
+        return {entity_key(item): content_hash(item) for item in self.load(ctype)}
+
+    def put(self, ctype: str, item: Dict[str, Any]):
+        items = self.load(ctype)
+        by_name = self._by_name(ctype)
+        key = entity_key(item)
+        existing = by_name.get(key)
+        if existing is None:
+            items.append(item)
+        elif existing is not item:
+            items[next(index for index, other in enumerate(items) if other is existing)] = item
+        by_name[key] = item
+        self._mark_dirty(ctype)
+
+    def delete(self, ctype: str, name: str):
+        items = self.load(ctype)
+        items[:] = [item for item in items if entity_key(item) != name]
+        self._by_name(ctype).pop(name, None)
+        self._mark_dirty(ctype)
+
+    def replace_all(self, ctype: str, items: List[Dict[str, Any]]) -> int:
+        self._cache[ctype] = list(items)
+        self._index.pop(ctype, None)
+        self._mark_dirty(ctype)
+        return len(items)
+
+    def _mark_dirty(self, ctype: str):
+        self._id_index.pop(ctype, None)
+        self._dirty.add(ctype)
+        if self._batch_depth == 0:
+            self.flush()
+
+    def flush(self):
+        if self._dirty and not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        for ctype in sorted(self._dirty):
+            with open(self._path(ctype), 'w', encoding='utf-8') as f:
+                json.dump(self._cache[ctype], f, indent=2, ensure_ascii=False)
+        self._dirty.clear()
+
+    @contextmanager
+    def batch(self) -> Iterator["JSONEntityStore"]:
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.flush()
+
+class MemoryEntityStore(JSONEntityStore):
+    """
+    Keeps entities in memory only. Used when one change set is applied to
+    several workspaces, so that IDs and fingerprints of one target are never
+    written back into the change set.
+    """
+    def __init__(self, components: Dict[str, List[Dict[str, Any]]]):
+        super().__init__("<memory>")
+        self._cache = {ctype: copy.deepcopy(items) for ctype, items in components.items()}
+
+    def describe(self, ctype: str) -> str:
+        return f"memory ({ctype})"
+
+    def load(self, ctype: str) -> List[Dict[str, Any]]:
+        return self._cache.setdefault(ctype, [])
+
+    def flush(self):
+        self._dirty.clear()
+
+class SQLiteEntityStore(EntityStore):
+    """
+    Transactional store keeping one row per entity in <directory>/entities.sqlite,
+    indexed by name, ID and content hash. Writes touch only the affected rows,
+    and names, ID lookups and hashes are answered without decoding bodies.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = os.path.join(directory, SQLITE_STORE_FILENAME)
+        # Autocommit mode; transactions are managed explicitly in batch()
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entities (
+                ctype TEXT NOT NULL,
+                name TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                entity_id TEXT,
+                content_hash TEXT NOT NULL,
+                body TEXT NOT NULL,
+                PRIMARY KEY (ctype, name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_entities_id ON entities(ctype, entity_id);
+            -- Covers names() and hashes(), so change detection never reads the bodies
+            DROP INDEX IF EXISTS idx_entities_hash;
+            CREATE INDEX IF NOT EXISTS idx_entities_hashes ON entities(ctype, position, name, content_hash);
+        """)
+        self._batch_depth = 0
+
+    def describe(self, ctype: str) -> str:
+        return f"{self.db_path} ({ctype})"
+
+    def load(self, ctype: str) -> List[Dict[str, Any]]:
+        rows = self.conn.execute("SELECT body FROM entities WHERE ctype = ? ORDER BY position", (ctype,))
+        return [json.loads(body) for (body,) in rows]
+
+    def get(self, ctype: str, name: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT body FROM entities WHERE ctype = ? AND name = ?", (ctype, name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_by_id(self, ctype: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT body FROM entities WHERE ctype = ? AND entity_id = ?", (ctype, str(entity_id))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def names(self, ctype: str) -> List[str]:
+        return [name for (name,) in self.conn.execute("SELECT name FROM entities WHERE ctype = ? ORDER BY position", (ctype,))]
+
+    def hashes(self, ctype: str) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT name, content_hash FROM entities WHERE ctype = ? ORDER BY position", (ctype,)))
+
+    def _row(self, ctype: str, item: Dict[str, Any], position: int) -> tuple:
+        entity_id = item.get(ID_FIELDS.get(ctype, ""))
+        return (
+            ctype, entity_key(item), position,
+            str(entity_id) if entity_id is not None else None,
+            content_hash(item), json.dumps(item, ensure_ascii=False)
+        )
+
+    def put(self, ctype: str, item: Dict[str, Any]):
+        with self.batch():
+            row = self.conn.execute(
+                "SELECT position FROM entities WHERE ctype = ? AND name = ?", (ctype, entity_key(item))).fetchone()
+            if row:
+                position = row[0]
+            else:
+                position = self.conn.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM entities WHERE ctype = ?", (ctype,)).fetchone()[0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entities (ctype, name, position, entity_id, content_hash, body) VALUES (?, ?, ?, ?, ?, ?)",
+                self._row(ctype, item, position))
+
+    def delete(self, ctype: str, name: str):
+        with self.batch():
+            self.conn.execute("DELETE FROM entities WHERE ctype = ? AND name = ?", (ctype, name))
+
+    def replace_all(self, ctype: str, items: List[Dict[str, Any]]) -> int:
+        existing = {
+            name: (position, body)
+            for name, position, body in self.conn.execute(
+                "SELECT name, position, body FROM entities WHERE ctype = ?", (ctype,))
+        }
+        rows = []
+        keep = set()
+        for position, item in enumerate(items):
+            row = self._row(ctype, item, position)
+            keep.add(row[1])
+            # Skip rows whose position and full body are unchanged
+            if existing.get(row[1]) != (position, row[5]):
+                rows.append(row)
+        stale = [(ctype, name) for name in existing if name not in keep]
+        with self.batch():
+            self.conn.executemany("DELETE FROM entities WHERE ctype = ? AND name = ?", stale)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entities (ctype, name, position, entity_id, content_hash, body) VALUES (?, ?, ?, ?, ?, ?)",
+                rows)
+        return len(rows)
+
+    @contextmanager
+    def batch(self) -> Iterator["SQLiteEntityStore"]:
+        if self._batch_depth == 0:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.execute("ROLLBACK")
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+def stored_backend(directory: str) -> Optional[str]:
+    """
+    Returns the backend an existing container directory was written with:
+    "json" if it holds any component JSON file, "sqlite" if it only holds
+    entities.sqlite, None if it holds neither.
+    """
+    if any(os.path.exists(os.path.join(directory, f"{ctype}.json")) for ctype in ID_FIELDS):
+        return "json"
+    if os.path.exists(os.path.join(directory, SQLITE_STORE_FILENAME)):
+        return "sqlite"
+    return None
+
+def open_store(directory: str, backend: Optional[str] = None) -> EntityStore:
+    """
+    Opens the entity store for a container directory.
+    Backend priority: argument > GTM_STORE_BACKEND environment variable > "json".
+    """
+    backend = backend or os.getenv("GTM_STORE_BACKEND") or "json"
+    if backend == "json":
+        return JSONEntityStore(directory)
+    if backend == "sqlite":
+        return SQLiteEntityStore(directory)
+    raise ValueError(f"Unknown store backend: {backend} (expected one of {', '.join(STORE_BACKENDS)})")
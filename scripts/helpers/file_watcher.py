@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Callable, Dict, Optional, Set, Tuple
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+EVENT_HEADER = struct.Struct("iIII")
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns (size, mtime_ns) of a file, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class PollingWatcher:
+    """
+    Portable watcher comparing file sizes and mtimes at a fixed interval.
+    """
+    def __init__(self, directory: str, accept: Callable[[str], bool], interval: float = 1.0):
+        self.directory = directory
+        self.accept = accept
+        self.interval = interval
+        self._signatures = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        signatures = {}
+        for name in os.listdir(self.directory):
+            if self.accept(name):
+                signature = file_signature(os.path.join(self.directory, name))
+                if signature:
+                    signatures[name] = signature
+        return signatures
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Blocks up to timeout seconds (None = forever) and returns the changed file names.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {name for name in set(current) | set(self._signatures) if current.get(name) != self._signatures.get(name)}
+            self._signatures = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            sleep = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(sleep)
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """
+    Linux watcher using inotify through libc (no third-party dependency).
+    """
+    def __init__(self, directory: str, accept: Callable[[str], bool]):
+        self.directory = directory
+        self.accept = accept
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            _, _, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            if name and self.accept(name):
+                changed.add(name)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def create_watcher(directory: str, accept: Callable[[str], bool], poll_interval: float = 1.0, force_polling: bool = False):
+    """
+    Returns an inotify watcher where available, falling back to mtime polling.
+    """
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory, accept)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory, accept, poll_interval)
+
+class DebouncedWatcher:
+    """
+    Groups bursts of file events: after the first change it keeps collecting
+    until the directory has been quiet for `debounce` seconds. Files the
+    process wrote itself can be registered with ignore_own_writes() so that
+    their events do not trigger another round.
+    """
+    def __init__(self, directory: str, accept: Callable[[str], bool], debounce: float = 0.5, poll_interval: float = 1.0, force_polling: bool = False):
+        self.directory = directory
+        self.debounce = debounce
+        self.watcher = create_watcher(directory, accept, poll_interval, force_polling)
+        self._own_writes: Dict[str, Tuple[int, int]] = {}
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if isinstance(self.watcher, InotifyWatcher) else "polling"
+
+    def ignore_own_writes(self, names):
+        """
+        Remembers the current signature of files we just wrote; events for them
+        are dropped as long as the file still has that signature.
+        """
+        for name in names:
+            signature = file_signature(os.path.join(self.directory, name))
+            if signature:
+                self._own_writes[name] = signature
+
+    def next_batch(self) -> Set[str]:
+        """
+        Blocks until a debounced batch of changes from other writers is available.
+        """
+        while True:
+            changed = set()
+            while not changed:
+                changed = self.watcher.wait(1.0)
+            while True:
+                more = self.watcher.wait(self.debounce)
+                if not more:
+                    break
+                changed |= more
+            changed = {
+                name for name in changed
+                if self._own_writes.get(name) is None
+                or file_signature(os.path.join(self.directory, name)) != self._own_writes[name]
+            }
+            if changed:
+                return changed
+
+    def close(self):
+        self.watcher.close()
@@ -1,6 +1,17 @@
 import re
 import os
-from typing import Dict, Optional
+import importlib.util
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+# GTM-generated read-only fields that must not be sent back to the API
+READ_ONLY_FIELDS = [
+    "path", "accountId", "containerId", "workspaceId", 
+    "fingerprint", "tagId", "triggerId", "variableId", "parentFolderId", "tagManagerUrl",
+    "monitoringMetadata"
+]
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
 def parse_gtm_workspace_url(url: str) -> Optional[Dict[str, str]]:
     """
@@ -39,3 +50,24 @@ def resolve_gtm_path(provided_path: Optional[str], gtm_public_id: str) -> str:
         path = os.path.join("tmp", "[[GTM_ID]]")
         
     return path.replace("[[GTM_ID]]", gtm_public_id)
+
+def clean_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Removes GTM-generated read-only fields from a tag, trigger, or variable.
+    """
+    cleaned = item.copy()
+    for field in READ_ONLY_FIELDS:
+        cleaned.pop(field, None)
+    
+    return cleaned
+
+def load_script(name: str) -> ModuleType:
+    """
+    Loads one of the executable scripts in scripts/bin as a module.
+    Needed because some script names (e.g. import.py) are Python keywords.
+    """
+    path = os.path.join(SCRIPTS_DIR, "bin", f"{name}.py")
+    spec = importlib.util.spec_from_file_location(f"gtm_bin_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
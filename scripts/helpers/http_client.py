@@ -1,17 +1,25 @@
 import urllib.request
 import urllib.error
 import urllib.parse
+import http.client
+import threading
+import time
 import json as json_lib
 from typing import Dict, Optional, Any, Union
 
+import tracing
+from response_cache import DEFAULT_CACHE_DIRECTORY, DEFAULT_MAX_BYTES, ResponseCache
+
 class HTTPResponse:
     """
     Simulates a requests.Response object.
     """
-    def __init__(self, status_code: int, body: bytes, headers: Any):
+    def __init__(self, status_code: int, body: bytes, headers: Any, retries: int = 0):
         self.status_code = status_code
         self.content = body
         self.headers = headers
+        # Reconnects needed to send the request (pooled connections only)
+        self.retries = retries
     
     def json(self) -> Any:
         return json_lib.loads(self.content.decode("utf-8"))
@@ -24,10 +32,100 @@ class HTTPResponse:
         if 400 <= self.status_code < 600:
             raise Exception(f"HTTP Error {self.status_code}: {self.text}")
 
+class ConnectionPool:
+    """
+    Keeps idle keep-alive connections per (scheme, host, port) so that
+    long-running processes can reuse TLS sessions across requests.
+    """
+    def __init__(self, max_idle_per_host: int = 4, timeout: float = 60):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key: tuple) -> http.client.HTTPConnection:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, key: tuple, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method: str, url: str, body: Optional[bytes], headers: Dict[str, str]) -> "HTTPResponse":
+        """
+        Sends a request over a pooled connection, reconnecting once if the
+        server closed an idle connection in the meantime.
+        """
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+
+        for attempt in range(2):
+            conn = self._acquire(key)
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                resp = conn.getresponse()
+                payload = resp.read()
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                if attempt == 0:
+                    continue
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return HTTPResponse(resp.status, payload, resp.headers, retries=attempt)
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
 class HTTPClient:
     """
     A standard library based HTTP client using urllib.
     """
+    # Shared keep-alive pool; None means one connection per request (urllib default)
+    pool: Optional[ConnectionPool] = None
+    # Opt-in cache for GET responses; None means every GET goes to the server
+    cache: Optional[ResponseCache] = None
+
+    @classmethod
+    def enable_connection_pool(cls, max_idle_per_host: int = 4) -> ConnectionPool:
+        """
+        Switches all requests to pooled keep-alive connections.
+        Intended for long-running processes such as the daemon.
+        """
+        if cls.pool is None:
+            cls.pool = ConnectionPool(max_idle_per_host=max_idle_per_host)
+        return cls.pool
+
+    @classmethod
+    def enable_response_cache(cls, directory: str = DEFAULT_CACHE_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES) -> ResponseCache:
+        """
+        Serves GET requests from an on-disk cache (see helpers/response_cache.py).
+        Callers that write are responsible for invalidating it (GTMClient does).
+        """
+        if cls.cache is None:
+            cls.cache = ResponseCache(directory, max_bytes)
+        return cls.cache
+
     @staticmethod
     def request(
         method: str,
@@ -35,10 +133,12 @@ class HTTPClient:
         headers: Optional[Dict[str, str]] = None,
         json: Optional[Any] = None,
         data: Optional[Any] = None,
-        params: Optional[Dict[str, Any]] = None
+        params: Optional[Dict[str, Any]] = None,
+        cache_scope: str = ""
     ) -> HTTPResponse:
         """
-        Sends an HTTP request using urllib.
+        Sends an HTTP request using urllib. GET responses are cached per
+        cache_scope (see response_cache.credential_scope) when the cache is on.
         """
         if params:
             # Handle both dict and sequence of tuples
@@ -64,15 +164,49 @@ class HTTPClient:
             else:
                 body = data
         
-        req = urllib.request.Request(url, data=body, headers=request_headers, method=method)
-        
-        try:
-            with urllib.request.urlopen(req) as resp:
-                return HTTPResponse(resp.getcode(), resp.read(), resp.info())
-        except urllib.error.HTTPError as e:
-            return HTTPResponse(e.code, e.read(), e.info())
-        except Exception as e:
-            raise e
+        active = tracing.tracer
+        if active is not None:
+            start = time.perf_counter()
+
+        cache = HTTPClient.cache if method == "GET" else None
+        cached = None
+        if cache is not None:
+            cached = cache.lookup(url, cache_scope)
+            if cached is not None and cached.fresh:
+                if active is not None:
+                    active.record_request("http", method, url, 200, start, time.perf_counter() - start, cache="hit")
+                return HTTPResponse(200, cached.body, {"ETag": cached.etag, "Content-Type": cached.content_type})
+            if cached is not None and cached.etag:
+                request_headers["If-None-Match"] = cached.etag
+
+        if HTTPClient.pool is not None:
+            response = HTTPClient.pool.request(method, url, body, request_headers)
+        else:
+            req = urllib.request.Request(url, data=body, headers=request_headers, method=method)
+
+            try:
+                with urllib.request.urlopen(req) as resp:
+                    response = HTTPResponse(resp.getcode(), resp.read(), resp.info())
+            except urllib.error.HTTPError as e:
+                response = HTTPResponse(e.code, e.read(), e.info())
+            except Exception as e:
+                raise e
+
+        cache_status = None
+        wire_status, wire_bytes = response.status_code, len(response.content)
+        if cache is not None:
+            if response.status_code == 304 and cached is not None:
+                cache.refresh(url, cache_scope)
+                response = HTTPResponse(200, cached.body, {"ETag": cached.etag, "Content-Type": cached.content_type}, retries=response.retries)
+                cache_status = "revalidated"
+            elif response.status_code == 200:
+                cache.store(url, response.content, response.headers.get("ETag"), response.headers.get("Content-Type"), cache_scope)
+                cache_status = "miss"
+
+        if active is not None:
+            active.record_request("http", method, url, wire_status, start, time.perf_counter() - start,
+                                  bytes_out=len(body) if body else 0, bytes_in=wire_bytes, retries=response.retries, cache=cache_status)
+        return response
 
     @classmethod
     def get(cls, url: str, **kwargs) -> HTTPResponse:
@@ -0,0 +1,152 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+from tracing import endpoint_template
+
+RESPONSE_CACHE_FILENAME = "responses.sqlite"
+DEFAULT_CACHE_DIRECTORY = os.path.join("tmp", "http_cache")
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# Seconds a cached response is served without asking the server, by endpoint
+# template (first match wins). Responses of other GET endpoints are only kept
+# if the server sent an ETag, and are revalidated with If-None-Match on every use.
+DEFAULT_TTLS: List[Tuple[str, float]] = [
+    (r"/accounts$", 24 * 3600),
+    (r"/accounts/\{id\}/containers$", 3600),
+    (r"/accounts/\{id\}/containers/\{id\}$", 3600),
+    (r"/containers/\{id\}/workspaces$", 300),
+    # Container versions never change once created
+    (r"/containers/\{id\}/versions/\{id\}$", 30 * 24 * 3600),
+]
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag", "content_type", "fresh"])
+
+def credential_scope(*credentials: Optional[str]) -> str:
+    """
+    Short hash identifying the credentials a response was fetched with, so that
+    users sharing a cache directory never see each other's responses.
+    """
+    digest = hashlib.sha256("\0".join(c or "" for c in credentials).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+class ResponseCache:
+    """
+    On-disk cache of GET responses in <directory>/responses.sqlite, keyed by
+    credential scope and URL. Entries are served while younger than their endpoint TTL, revalidated with
+    their ETag afterwards, and evicted least recently used first once the
+    bodies exceed max_bytes. Safe to share between threads and processes.
+    """
+    def __init__(self, directory: str = DEFAULT_CACHE_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Optional[List[Tuple[str, float]]] = None):
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (DEFAULT_TTLS if ttls is None else ttls)]
+        self.db_path = os.path.join(directory, RESPONSE_CACHE_FILENAME)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(responses)")]
+        if columns and "scope" not in columns:
+            # Cache written before entries were scoped by credentials; it is only a cache
+            self.conn.execute("DROP TABLE responses")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                scope TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etag TEXT,
+                content_type TEXT,
+                stored_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                size INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                PRIMARY KEY (scope, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_url ON responses(url);
+            CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+        """)
+
+    def ttl_for(self, url: str) -> float:
+        template = endpoint_template(url)
+        for pattern, ttl in self.ttls:
+            if pattern.search(template):
+                return ttl
+        return 0
+
+    def lookup(self, url: str, scope: str = "") -> Optional[CachedResponse]:
+        """
+        Returns the response cached for url under scope (fresh or not), or None.
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT body, etag, content_type, stored_at FROM responses WHERE scope = ? AND url = ?", (scope, url)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE scope = ? AND url = ?", (now, scope, url))
+        body, etag, content_type, stored_at = row
+        return CachedResponse(bytes(body), etag, content_type, now - stored_at < self.ttl_for(url))
+
+    def store(self, url: str, body: bytes, etag: Optional[str], content_type: Optional[str], scope: str = ""):
+        """
+        Stores a 200 response if it can be reused: it has a TTL or an ETag.
+        """
+        size = len(body) + len(url)
+        if (not etag and self.ttl_for(url) <= 0) or size > self.max_bytes // 4:
+            return
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (scope, url, etag, content_type, stored_at, last_used, size, body) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (scope, url, etag, content_type, now, now, size, body))
+            self._evict()
+
+    def refresh(self, url: str, scope: str = ""):
+        """
+        Marks an entry as just validated (the server answered 304 Not Modified).
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute("UPDATE responses SET stored_at = ?, last_used = ? WHERE scope = ? AND url = ?", (now, now, scope, url))
+
+    def invalidate(self, prefix: str) -> int:
+        """
+        Drops every entry whose URL is prefix or lies below it (path, query or
+        custom method suffix), in all scopes: a write changes what every
+        credential sees. Returns the number of entries removed.
+        """
+        prefix = prefix.rstrip("/")
+        n = len(prefix) + 1
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM responses WHERE url = ? OR substr(url, 1, ?) IN (?, ?, ?)",
+                (prefix, n, f"{prefix}/", f"{prefix}?", f"{prefix}:"))
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so that the next few stores do not evict again
+        excess = total - int(self.max_bytes * 0.9)
+        removed = []
+        for scope, url, size in self.conn.execute("SELECT scope, url, size FROM responses ORDER BY last_used"):
+            if excess <= 0:
+                break
+            removed.append((scope, url))
+            excess -= size
+        self.conn.executemany("DELETE FROM responses WHERE scope = ? AND url = ?", removed)
+
+    def close(self):
+        self.conn.close()
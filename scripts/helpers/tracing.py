@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+# Active tracer, or None when tracing is off. Hooks read this attribute
+# (tracing.tracer, never a from-import copy) and do nothing else when it is None.
+tracer: Optional["Tracer"] = None
+
+_NO_SPAN = nullcontext()
+ID_SEGMENT_PATTERN = re.compile(r"/\d+(?=[/:]|$)")
+
+def endpoint_template(url: str) -> str:
+    """
+    URL path with numeric IDs replaced by {id} and without the query, e.g.
+    /tagmanager/v2/accounts/{id}/containers/{id}/workspaces/{id}/tags
+    """
+    path = url.split("?", 1)[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].partition("/")[2]
+    return ID_SEGMENT_PATTERN.sub("/{id}", path)
+
+class Tracer:
+    """
+    Collects spans (named phases of a run) and requests. Request records come
+    from two layers: "http" (HTTPClient.request, one per wire request) and
+    "api" (GTMClient._request, one per API call including the 401 retry and
+    the time spent waiting for the rate limiter).
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        # list.append is atomic, so threads (bin/rollout.py) can record without a lock
+        self.events: List[Dict[str, Any]] = []
+
+    def record_request(self, layer: str, method: str, url: str, status: int, start: float, duration: float,
+                       bytes_out: int = 0, bytes_in: int = 0, retries: int = 0, throttle_wait: float = 0.0,
+                       cache: Optional[str] = None):
+        self.events.append({
+            "type": "request", "layer": layer, "method": method, "endpoint": endpoint_template(url),
+            "url": url.split("?", 1)[0], "status": status, "start": start - self.origin, "duration": duration,
+            "bytes_out": bytes_out, "bytes_in": bytes_in, "retries": retries, "throttle_wait": throttle_wait,
+            "cache": cache, "thread": threading.get_ident(),
+        })
+
+    @contextmanager
+    def span(self, name: str, args: Dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.events.append({
+                "type": "span", "name": name, "start": start - self.origin,
+                "duration": time.perf_counter() - start, "args": args, "thread": threading.get_ident(),
+            })
+
+    def chrome_events(self) -> List[Dict[str, Any]]:
+        """
+        Events in the Chrome trace format (chrome://tracing, Perfetto):
+        complete ("X") events with microsecond timestamps.
+        """
+        events = []
+        for event in self.events:
+            base = {"ph": "X", "pid": self.pid, "tid": event["thread"],
+                    "ts": round(event["start"] * 1e6, 1), "dur": round(event["duration"] * 1e6, 1)}
+            if event["type"] == "span":
+                events.append(dict(base, name=event["name"], cat="phase", args=event["args"]))
+                continue
+            args = {k: event[k] for k in ("url", "status", "bytes_out", "bytes_in", "retries", "cache") if event[k] is not None}
+            events.append(dict(base, name=f"{event['method']} {event['endpoint']}", cat=event["layer"], args=args))
+            if event["throttle_wait"] > 0:
+                events.append(dict(base, name="throttle", cat="throttle", dur=round(event["throttle_wait"] * 1e6, 1)))
+        return events
+
+    def write(self, path: str):
+        """
+        Writes the trace: JSON Lines (one raw event per line, seconds relative
+        to the start of tracing) if path ends in .jsonl, a Chrome trace otherwise.
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(".jsonl"):
+                for event in self.events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            else:
+                json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}, f)
+
+    def endpoint_stats(self) -> List[Dict[str, Any]]:
+        """
+        Per (method, endpoint): calls, latency and bytes from the http layer,
+        retries and throttle wait from the api layer. Endpoints only seen by
+        one layer are reported from that layer. Sorted by total time, slowest first.
+        """
+        layers: Dict[str, Dict[tuple, Dict[str, Any]]] = {"http": {}, "api": {}}
+        for event in self.events:
+            if event["type"] != "request":
+                continue
+            key = (event["method"], event["endpoint"])
+            entry = layers[event["layer"]].setdefault(key, {
+                "method": key[0], "endpoint": key[1], "calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                "bytes_in": 0, "bytes_out": 0, "errors": 0, "retries": 0, "throttle_wait": 0.0, "cache_hits": 0,
+            })
+            entry["calls"] += 1
+            entry["seconds"] += event["duration"]
+            entry["max_seconds"] = max(entry["max_seconds"], event["duration"])
+            entry["bytes_in"] += event["bytes_in"]
+            entry["bytes_out"] += event["bytes_out"]
+            entry["errors"] += event["status"] >= 400
+            entry["retries"] += event["retries"]
+            entry["throttle_wait"] += event["throttle_wait"]
+            # Served from the response cache, with (revalidated) or without a request
+            entry["cache_hits"] += event["cache"] in ("hit", "revalidated")
+
+        stats = layers["http"]
+        for key, api in layers["api"].items():
+            entry = stats.get(key)
+            if entry is None:
+                stats[key] = api
+                continue
+            entry["retries"] += api["retries"]
+            entry["throttle_wait"] += api["throttle_wait"]
+        return sorted(stats.values(), key=lambda e: e["seconds"], reverse=True)
+
+    def span_stats(self) -> List[Dict[str, Any]]:
+        """
+        Per span name: count and total seconds, in order of first appearance.
+        """
+        stats: Dict[str, Dict[str, Any]] = {}
+        for event in self.events:
+            if event["type"] == "span":
+                entry = stats.setdefault(event["name"], {"name": event["name"], "count": 0, "seconds": 0.0})
+                entry["count"] += 1
+                entry["seconds"] += event["duration"]
+        return list(stats.values())
+
+    def print_summary(self, limit: int = 10):
+        phases = self.span_stats()
+        if phases:
+            print("\nPhases:")
+            for phase in phases:
+                count = f" (x{phase['count']})" if phase["count"] > 1 else ""
+                print(f"  {phase['seconds'] * 1000:>10.1f} ms  {phase['name']}{count}")
+        endpoints = self.endpoint_stats()
+        if not endpoints:
+            return
+        print(f"\nSlowest endpoints ({min(limit, len(endpoints))} of {len(endpoints)}):")
+        print(f"  {'Calls':>5} {'Total ms':>10} {'Mean ms':>8} {'Max ms':>8} {'KB in':>8} {'KB out':>7} {'Err':>4} {'Retry':>5} {'Wait ms':>8} {'Cached':>6}  Endpoint")
+        for e in endpoints[:limit]:
+            print(f"  {e['calls']:>5} {e['seconds'] * 1000:>10.1f} {e['seconds'] * 1000 / e['calls']:>8.1f} {e['max_seconds'] * 1000:>8.1f} "
+                  f"{e['bytes_in'] / 1024:>8.1f} {e['bytes_out'] / 1024:>7.1f} {e['errors']:>4} {e['retries']:>5} "
+                  f"{e['throttle_wait'] * 1000:>8.1f} {e['cache_hits']:>6}  {e['method']} {e['endpoint']}")
+
+def enable() -> Tracer:
+    """
+    Starts tracing for the rest of the process (idempotent).
+    """
+    global tracer
+    if tracer is None:
+        tracer = Tracer()
+    return tracer
+
+def disable() -> Optional[Tracer]:
+    """
+    Stops tracing and returns the tracer with what it collected.
+    """
+    global tracer
+    stopped, tracer = tracer, None
+    return stopped
+
+def span(name: str, **args):
+    """
+    Context manager timing one phase of a run. A shared no-op when tracing is off.
+    """
+    if tracer is None:
+        return _NO_SPAN
+    return tracer.span(name, args)
+
+def finish(path: str, limit: int = 10):
+    """
+    Stops tracing, writes the trace to path and prints the summary tables.
+    """
+    stopped = disable()
+    if stopped is None:
+        return
+    stopped.write(path)
+    stopped.print_summary(limit)
+    print(f"\nTrace written to {path}")